@@ -1,7 +1,7 @@
 {
     "name": "Email activity tracking",
     "summary": "Email activity tracking system for all mails sent",
-    "version": "17.0.1.0.0",
+    "version": "17.0.1.5.0",
     "category": "Social Network",
     "website": "https://www.techvoot.com",
     "author": "Techvoot Solutions",
@@ -33,6 +33,9 @@
             "mail_activity_tracking/static/src/components/failed_message_review/*",
             "mail_activity_tracking/static/src/components/failed_messages_panel/*",
         ],
+        "web.qunit_suite_tests": [
+            "mail_activity_tracking/static/tests/**/*",
+        ],
     },
     "demo": ["demo/demo.xml"],
 }
@@ -18,3 +18,29 @@ class MailTrackingMailBoxController(MailboxController):
             limit=limit,
         )
         return {**res, "messages": res["messages"].message_format()}
+
+    @route("/mail/tracking/statuses", methods=["POST"], type="json", auth="user")
+    def mail_tracking_statuses(self, message_ids, expand_ids=()):
+        """Fetch the tracking statuses of the displayed messages. Recipients
+        are only counted beyond a threshold, unless their message is expanded"""
+        return request.env["mail.message"]._mail_tracking_statuses_fetch(
+            message_ids, expand_ids
+        )
+
+    @route("/mail/thread/failed_messages", methods=["POST"], type="json", auth="user")
+    def mail_thread_failed_messages(
+        self, thread_model, thread_id, before=None, limit=30
+    ):
+        """Fetch the failed messages of a record by page, and their number
+        with the first one. ``before`` is the (date, id) pair of the last
+        message of the previous page"""
+        MailMessage = request.env["mail.message"]
+        messages = MailMessage._failed_messages_search(
+            thread_model, thread_id, before=before, limit=limit
+        )
+        res = {"messages": messages.message_format()}
+        if not before:
+            res["count"] = MailMessage.search_count(
+                MailMessage._failed_messages_domain(thread_model, thread_id)
+            )
+        return res
@@ -68,7 +68,9 @@ class MailTrackingController(MailController):
                     _logger.warning(
                         "MailTracking email '%s' not found", tracking_email_id
                     )
-                elif tracking_email.state in ("sent", "delivered"):
+                else:
+                    # Every open is counted, the tracking only stores a
+                    # bounded number of open events
                     tracking_email.event_create("open", metadata)
             except Exception as e:
                 _logger.warning(e)
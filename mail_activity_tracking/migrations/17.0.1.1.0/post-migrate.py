@@ -0,0 +1,69 @@
+import logging
+
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+LEGACY_COLUMNS = ("ip", "user_agent", "os_family", "ua_family", "ua_type")
+# Must match `mail.activity.client._client_fingerprint`
+FINGERPRINT = """
+    encode(sha1(convert_to(concat_ws(E'\\x1f',
+        COALESCE(NULLIF(e.ip, ''), ''),
+        COALESCE(NULLIF(e.user_agent, ''), ''),
+        COALESCE(NULLIF(e.os_family, ''), ''),
+        COALESCE(NULLIF(e.ua_family, ''), ''),
+        COALESCE(NULLIF(e.ua_type, ''), '')
+    ), 'UTF8')), 'hex')
+"""
+HAS_CLIENT = """
+    COALESCE(
+        NULLIF(e.ip, ''),
+        NULLIF(e.user_agent, ''),
+        NULLIF(e.os_family, ''),
+        NULLIF(e.ua_family, ''),
+        NULLIF(e.ua_type, '')
+    ) IS NOT NULL
+"""
+
+
+def migrate(cr, version):
+    """Intern the client strings of the existing events and drop the now
+    redundant columns"""
+    if not version or not column_exists(cr, "mail_activity_event", "user_agent"):
+        return
+    cr.execute(
+        f"""
+        INSERT INTO mail_activity_client
+            (fingerprint, ip, user_agent, os_family, ua_family, ua_type,
+             create_date, write_date)
+        SELECT DISTINCT ON (fingerprint)
+            fingerprint, ip, user_agent, os_family, ua_family, ua_type,
+            now() at time zone 'UTC', now() at time zone 'UTC'
+        FROM (
+            SELECT {FINGERPRINT} AS fingerprint,
+                NULLIF(e.ip, '') AS ip,
+                NULLIF(e.user_agent, '') AS user_agent,
+                NULLIF(e.os_family, '') AS os_family,
+                NULLIF(e.ua_family, '') AS ua_family,
+                NULLIF(e.ua_type, '') AS ua_type
+            FROM mail_activity_event e
+            WHERE {HAS_CLIENT}
+        ) AS clients
+        ON CONFLICT (fingerprint) DO NOTHING
+        """
+    )
+    _logger.info("Interned %s tracking event clients", cr.rowcount)
+    cr.execute(
+        f"""
+        UPDATE mail_activity_event e
+        SET client_id = c.id
+        FROM mail_activity_client c
+        WHERE {HAS_CLIENT} AND c.fingerprint = {FINGERPRINT}
+        """
+    )
+    for column in LEGACY_COLUMNS:
+        cr.execute(f"ALTER TABLE mail_activity_event DROP COLUMN IF EXISTS {column}")
+    _logger.info(
+        "Legacy client columns dropped from mail_activity_event. "
+        "Run `VACUUM FULL mail_activity_event` to give the space back to the OS."
+    )
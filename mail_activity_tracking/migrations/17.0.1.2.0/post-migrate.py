@@ -0,0 +1,40 @@
+def migrate(cr, version):
+    """Initialize the engagement counters from the stored events"""
+    if not version:
+        return
+    cr.execute(
+        """
+        INSERT INTO mail_activity_url
+            (tracking_email_id, url, click_count, first_click, last_click,
+             create_date, write_date)
+        SELECT tracking_email_id, COALESCE(url, ''), COUNT(*), MIN(time), MAX(time),
+            now() at time zone 'UTC', now() at time zone 'UTC'
+        FROM mail_activity_event
+        WHERE event_type = 'click'
+        GROUP BY tracking_email_id, COALESCE(url, '')
+        ON CONFLICT (tracking_email_id, url) DO NOTHING
+        """
+    )
+    cr.execute(
+        """
+        UPDATE mail_activity_tracking t SET
+            open_count = e.open_count,
+            click_count = e.click_count,
+            unique_click_urls = e.unique_click_urls,
+            first_open = e.first_open,
+            last_open = e.last_open
+        FROM (
+            SELECT tracking_email_id,
+                COUNT(*) FILTER (WHERE event_type = 'open') AS open_count,
+                COUNT(*) FILTER (WHERE event_type = 'click') AS click_count,
+                COUNT(DISTINCT COALESCE(url, ''))
+                    FILTER (WHERE event_type = 'click') AS unique_click_urls,
+                MIN(time) AS first_open,
+                MAX(time) AS last_open
+            FROM mail_activity_event
+            WHERE event_type IN ('open', 'click')
+            GROUP BY tracking_email_id
+        ) AS e
+        WHERE t.id = e.tracking_email_id
+        """
+    )
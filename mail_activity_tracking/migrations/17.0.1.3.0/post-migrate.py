@@ -0,0 +1,24 @@
+from odoo.tools.sql import column_exists
+
+
+def migrate(cr, version):
+    """Leads get their mail status from the generic mixin instead of a link to
+    a single tracking"""
+    if not version:
+        return
+    cr.execute(
+        """
+        UPDATE crm_lead AS r
+        SET mail_status = l.state, mail_status_date = l.time
+        FROM (
+            SELECT DISTINCT ON (m.res_id) m.res_id, t.state, t.time
+            FROM mail_activity_tracking t
+            JOIN mail_message m ON m.id = t.mail_message_id
+            WHERE m.model = 'crm.lead'
+            ORDER BY m.res_id, t.time DESC NULLS LAST, t.id DESC
+        ) AS l
+        WHERE r.id = l.res_id
+        """
+    )
+    if column_exists(cr, "crm_lead", "mail_activity_tracking_id"):
+        cr.execute("ALTER TABLE crm_lead DROP COLUMN mail_activity_tracking_id")
@@ -0,0 +1,9 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """Summarize the existing trackings by recipient address"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env["mail.activity.reputation"]._rebuild()
@@ -0,0 +1,9 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """Count the existing failed messages by partner"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env["mail.activity.failed.counter"]._rebuild()
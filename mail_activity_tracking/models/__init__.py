@@ -5,8 +5,18 @@ from . import mail_bounced_mixin
 from . import mail_guest
 from . import mail_mail
 from . import mail_message
+from . import mail_notification
+from . import mail_followers
+from . import ir_rule
 from . import mail_activity_tracking
+from . import mail_activity_tracking_update
+from . import mail_activity_client
 from . import mail_activity_event
+from . import mail_activity_url
+from . import mail_activity_reputation
+from . import mail_activity_bounce
+from . import mail_activity_failed_counter
+from . import mail_activity_status_mixin
 from . import res_partner
 from . import mail_thread
 from . import mail_alias
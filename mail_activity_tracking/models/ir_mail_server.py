@@ -129,6 +129,13 @@ class IrMailServer(models.Model):
     ):
         message_id = False
         tracking_email = self._tracking_email_get(message)
+        tracking_sudo = tracking_email.sudo()
+        if tracking_sudo.state == "suppressed":
+            # Same as a recipient without a valid address: the mail fails
+            # for them, instead of being recorded as sent
+            if tracking_sudo.mail_id:
+                tracking_sudo.mail_id.failure_reason = tracking_sudo.error_description
+            raise AssertionError(self.NO_VALID_RECIPIENT)
         smtp_server_used = self.sudo()._smtp_server_get(mail_server_id, smtp_server)
         try:
             message_id = super().send_email(
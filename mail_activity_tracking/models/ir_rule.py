@@ -0,0 +1,19 @@
+from odoo import api, models
+
+
+class IrRule(models.Model):
+    _inherit = "ir.rule"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """The trackings readable by the users rely on the record rules"""
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().unlink()
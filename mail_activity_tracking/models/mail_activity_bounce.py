@@ -0,0 +1,82 @@
+from markupsafe import Markup
+
+from odoo import SUPERUSER_ID, _, api, fields, models
+
+# Pending notifications posted by each run of the scheduled action
+DIGEST_BATCH = 1000
+
+
+class MailActivityBounce(models.Model):
+    """Bounce notifications waiting to be posted on the partners chatter.
+
+    Posting them as they come means a chatter message per event inside the
+    webhooks and the SMTP error handling, so they're queued here and posted as
+    a digest per partner by a scheduled action.
+    """
+
+    _name = "mail.activity.bounce"
+    _description = "MailActivity pending bounce notification"
+    _order = "id"
+
+    partner_id = fields.Many2one(
+        comodel_name="res.partner",
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete="cascade",
+    )
+    email = fields.Char(readonly=True)
+    reason = fields.Char(readonly=True)
+    event_id = fields.Many2one(
+        comodel_name="mail.activity.event", readonly=True, ondelete="set null"
+    )
+
+    @api.model
+    def _enqueue(self, partners, reason, event=None):
+        return self.create(
+            [
+                {
+                    "partner_id": partner.id,
+                    "email": partner.email,
+                    "reason": reason,
+                    "event_id": event.id if event else False,
+                }
+                for partner in partners
+            ]
+        )
+
+    def _digest_line(self):
+        self.ensure_one()
+        event_str = (
+            Markup(
+                '<a href="#" data-oe-model="mail.activity.event" data-oe-id="%s">%s</a>'
+            )
+            % (self.event_id.id, self.event_id.id)
+            if self.event_id
+            else _("unknown")
+        )
+        return Markup(
+            _(
+                "Email has been bounced: %(email)s\nReason: "
+                "%(reason)s\nEvent: %(event_str)s"
+            )
+        ) % {"email": self.email, "reason": self.reason, "event_str": event_str}
+
+    @api.model
+    def _cron_post_digests(self, limit=DIGEST_BATCH):
+        """Post the pending notifications of each partner as a single message"""
+        pending = self.search([], limit=limit)
+        bounces_by_partner = pending.grouped("partner_id")
+        for partner, bounces in bounces_by_partner.items():
+            lines = Markup("").join(
+                Markup("<li>%s</li>") % bounce._digest_line() for bounce in bounces
+            )
+            # Posted by the superuser, as the bounces came from the mail server
+            partner.with_user(SUPERUSER_ID).message_post(
+                body=Markup("<ul>%s</ul>") % lines
+            )
+        pending.unlink()
+        if len(pending) == limit:
+            self.env.ref(
+                "mail_activity_tracking.ir_cron_mail_activity_bounce_digest"
+            )._trigger()
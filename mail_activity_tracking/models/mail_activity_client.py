@@ -0,0 +1,103 @@
+import hashlib
+
+from odoo import api, fields, models
+from odoo.tools.lru import LRU
+
+# Fingerprint -> id entries kept in memory by each worker
+CLIENT_CACHE_SIZE = 4096
+CLIENT_FIELDS = ("ip", "user_agent", "os_family", "ua_family", "ua_type")
+
+
+class MailActivityClient(models.Model):
+    """Interned client fingerprints shared by all the tracking events.
+
+    The same few user agents and IPs repeat on millions of opens and clicks, so
+    events only store a reference to a row of this table.
+    """
+
+    _name = "mail.activity.client"
+    _description = "MailActivity client fingerprint"
+    _rec_name = "ua_family"
+
+    fingerprint = fields.Char(required=True, readonly=True)
+    ip = fields.Char(string="User IP", readonly=True)
+    user_agent = fields.Char(readonly=True)
+    os_family = fields.Char(string="Operating system family", readonly=True)
+    ua_family = fields.Char(string="User agent family", readonly=True)
+    ua_type = fields.Char(string="User agent type", readonly=True)
+
+    _sql_constraints = [
+        (
+            "fingerprint_unique",
+            "UNIQUE(fingerprint)",
+            "Client fingerprints must be unique!",
+        )
+    ]
+
+    @api.depends("ua_family", "os_family", "ip")
+    def _compute_display_name(self):
+        for client in self:
+            parts = [client.ua_family, client.os_family, client.ip]
+            client.display_name = " / ".join(filter(None, parts)) or client.fingerprint
+
+    @api.model
+    def _client_values(self, metadata):
+        """Normalize the client related metadata. The user agent can come as a
+        werkzeug object from the open tracking route"""
+        return {
+            fname: str(metadata[fname]) if metadata.get(fname) else False
+            for fname in CLIENT_FIELDS
+        }
+
+    @api.model
+    def _client_fingerprint(self, values):
+        key = "\x1f".join(values[fname] or "" for fname in CLIENT_FIELDS)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _client_cache(self):
+        """Per worker fingerprint cache, shared by all the environments"""
+        try:
+            return self.env.registry._mail_tracking_client_cache
+        except AttributeError:
+            cache = self.env.registry._mail_tracking_client_cache = LRU(
+                CLIENT_CACHE_SIZE
+            )
+            return cache
+
+    @api.model
+    def _get_client_id(self, metadata):
+        """Return the id of the fingerprint matching the given event metadata,
+        creating it when it's the first time we see it"""
+        values = self._client_values(metadata)
+        if not any(values.values()):
+            return False
+        fingerprint = self._client_fingerprint(values)
+        cache = self._client_cache()
+        client_id = cache.get(fingerprint)
+        if client_id:
+            return client_id
+        # Concurrent requests may be interning the same fingerprint
+        self.env.cr.execute(
+            """
+            INSERT INTO mail_activity_client
+                (fingerprint, ip, user_agent, os_family, ua_family, ua_type,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, %s, %s, %s,
+                    %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')
+            ON CONFLICT (fingerprint) DO NOTHING
+            """,
+            (
+                fingerprint,
+                *(values[fname] or None for fname in CLIENT_FIELDS),
+                self.env.uid,
+                self.env.uid,
+            ),
+        )
+        self.env.cr.execute(
+            "SELECT id FROM mail_activity_client WHERE fingerprint = %s",
+            (fingerprint,),
+        )
+        client_id = self.env.cr.fetchone()[0]
+        # Only cache ids that are sure to exist for the other transactions
+        self.env.cr.postcommit.add(lambda: cache.__setitem__(fingerprint, client_id))
+        return client_id
@@ -4,6 +4,9 @@ from datetime import datetime
 
 from odoo import api, fields, models
 
+# Opens and clicks don't hide failures nor recipient opt-outs
+ENGAGEMENT_LOCKED_STATES = {"error", "rejected", "spam", "unsub", "bounced"}
+
 
 class MailActivityEvent(models.Model):
     _name = "mail.activity.event"
@@ -49,12 +52,20 @@ class MailActivityEvent(models.Model):
     )
     smtp_server = fields.Char(string="SMTP server", readonly=True)
     url = fields.Char(string="Clicked URL", readonly=True)
-    ip = fields.Char(string="User IP", readonly=True)
-    user_agent = fields.Char(readonly=True)
+    # Client strings repeat across millions of events, so they're interned
+    client_id = fields.Many2one(
+        string="Client",
+        comodel_name="mail.activity.client",
+        readonly=True,
+        index=True,
+        ondelete="restrict",
+    )
+    ip = fields.Char(related="client_id.ip")
+    user_agent = fields.Char(related="client_id.user_agent")
     mobile = fields.Boolean(string="Is mobile?", readonly=True)
-    os_family = fields.Char(string="Operating system family", readonly=True)
-    ua_family = fields.Char(string="User agent family", readonly=True)
-    ua_type = fields.Char(string="User agent type", readonly=True)
+    os_family = fields.Char(related="client_id.os_family")
+    ua_family = fields.Char(related="client_id.ua_family")
+    ua_type = fields.Char(related="client_id.ua_type")
     user_country_id = fields.Many2one(
         string="User country", readonly=True, comodel_name="res.country"
     )
@@ -100,13 +111,11 @@ class MailActivityEvent(models.Model):
             "date": metadata.get("date", fields.Date.to_string(dt)),
             "tracking_email_id": tracking_email.id,
             "event_type": event_type,
-            "ip": metadata.get("ip", False),
+            "client_id": self.env["mail.activity.client"].sudo()._get_client_id(
+                metadata
+            ),
             "url": metadata.get("url", False),
-            "user_agent": metadata.get("user_agent", False),
             "mobile": metadata.get("mobile", False),
-            "os_family": metadata.get("os_family", False),
-            "ua_family": metadata.get("ua_family", False),
-            "ua_type": metadata.get("ua_type", False),
             "user_country_id": metadata.get("user_country_id", False),
             "error_type": metadata.get("error_type", False),
             "error_description": metadata.get("error_description", False),
@@ -128,6 +137,11 @@ class MailActivityEvent(models.Model):
         )
         return self._process_data(tracking_email, metadata, event_type, state)
 
+    def _process_engagement(self, tracking_email, metadata, event_type):
+        if tracking_email.state in ENGAGEMENT_LOCKED_STATES:
+            return self._process_data(tracking_email, metadata, event_type, "opened")
+        return self._process_status(tracking_email, metadata, event_type, "opened")
+
     @api.model
     def process_sent(self, tracking_email, metadata):
         return self._process_status(tracking_email, metadata, "sent", "sent")
@@ -152,11 +166,11 @@ class MailActivityEvent(models.Model):
 
     @api.model
     def process_open(self, tracking_email, metadata):
-        return self._process_status(tracking_email, metadata, "open", "opened")
+        return self._process_engagement(tracking_email, metadata, "open")
 
     @api.model
     def process_click(self, tracking_email, metadata):
-        return self._process_status(tracking_email, metadata, "click", "opened")
+        return self._process_engagement(tracking_email, metadata, "click")
 
     @api.model
     def process_spam(self, tracking_email, metadata):
@@ -0,0 +1,132 @@
+from odoo import api, fields, models
+
+# Cursor precommit data holding the partners whose counters must be refreshed
+PENDING_KEY = "mail_activity_tracking.failed_counter"
+
+
+class MailActivityFailedCounter(models.Model):
+    """Number of failed messages by partner, shown on the discuss mailbox.
+
+    Counting them from `is_failed_message` on every web client load is slow
+    and the count gets outdated, so it's refreshed at the end of the
+    transactions changing failed messages and pushed to the partner.
+    """
+
+    _name = "mail.activity.failed.counter"
+    _description = "MailActivity failed messages counter"
+    _rec_name = "partner_id"
+
+    partner_id = fields.Many2one(
+        comodel_name="res.partner", required=True, readonly=True, ondelete="cascade"
+    )
+    counter = fields.Integer(readonly=True)
+
+    _sql_constraints = [
+        ("partner_id_unique", "UNIQUE(partner_id)", "Partners must be unique!")
+    ]
+
+    @api.model
+    def _get(self, partner):
+        return self.search([("partner_id", "=", partner.id)], limit=1).counter
+
+    @api.model
+    def _schedule(self, partner_ids):
+        """Refresh the counters of the partners once, before committing"""
+        partner_ids = set(filter(None, partner_ids))
+        if not partner_ids:
+            return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_KEY)
+        if pending is None:
+            pending = precommit.data[PENDING_KEY] = set()
+            counters = self.sudo()
+            precommit.add(
+                lambda: counters._refresh(precommit.data.pop(PENDING_KEY, ()))
+            )
+        pending.update(partner_ids)
+
+    @api.model
+    def _refresh(self, partner_ids, notify=True):
+        """Count the failed messages of the partners in a single query, and
+        push the changed counters to them"""
+        partner_ids = list(filter(None, partner_ids))
+        if not partner_ids:
+            return {}
+        self.env["mail.message"].flush_model(
+            ["mail_tracking_needs_action", "author_id"]
+        )
+        self.env["mail.notification"].flush_model(
+            ["mail_message_id", "res_partner_id"]
+        )
+        self.env["mail.activity.tracking"].flush_model(["mail_message_id", "state"])
+        self.flush_model()
+        now = self.env.cr.now()
+        self.env.cr.execute(
+            """
+            INSERT INTO mail_activity_failed_counter AS c (
+                partner_id, counter, create_uid, create_date, write_uid, write_date
+            )
+            SELECT p.id, COUNT(m.id), %(uid)s, %(now)s, %(uid)s, %(now)s
+            FROM res_partner p
+            LEFT JOIN mail_message m ON m.mail_tracking_needs_action
+                AND (
+                    m.author_id = p.id
+                    OR EXISTS (
+                        SELECT 1 FROM mail_notification n
+                        WHERE n.mail_message_id = m.id AND n.res_partner_id = p.id
+                    )
+                )
+                AND EXISTS (
+                    SELECT 1 FROM mail_activity_tracking t
+                    WHERE t.mail_message_id = m.id AND t.state IN %(states)s
+                )
+            WHERE p.id IN %(partner_ids)s
+            GROUP BY p.id
+            ON CONFLICT (partner_id) DO UPDATE SET
+                counter = EXCLUDED.counter,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            WHERE c.counter IS DISTINCT FROM EXCLUDED.counter
+            RETURNING c.partner_id, c.counter
+            """,
+            {
+                "uid": self.env.uid,
+                "now": now,
+                "states": tuple(self.env["mail.message"].get_failed_states()),
+                "partner_ids": tuple(partner_ids),
+            },
+        )
+        changed = dict(self.env.cr.fetchall())
+        self.invalidate_model()
+        if notify and changed:
+            partners = self.env["res.partner"].browse(changed)
+            self.env["bus.bus"]._sendmany(
+                [
+                    (
+                        partner,
+                        "mail_activity_tracking/failed_counter",
+                        {"counter": changed[partner.id]},
+                    )
+                    for partner in partners
+                ]
+            )
+        return changed
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the counters of all the partners. Run it from a shell
+        to initialize the table:
+        ``env["mail.activity.failed.counter"]._rebuild()``"""
+        self.env.cr.execute(
+            """
+            SELECT m.author_id FROM mail_message m
+            WHERE m.mail_tracking_needs_action AND m.author_id IS NOT NULL
+            UNION
+            SELECT n.res_partner_id FROM mail_notification n
+            JOIN mail_message m ON m.id = n.mail_message_id
+            WHERE m.mail_tracking_needs_action AND n.res_partner_id IS NOT NULL
+            UNION
+            SELECT partner_id FROM mail_activity_failed_counter
+            """
+        )
+        self._refresh([row[0] for row in self.env.cr.fetchall()], notify=False)
@@ -0,0 +1,397 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_index
+
+# Tracking states with a counter column
+REPUTATION_STATES = (
+    "error",
+    "deferred",
+    "sent",
+    "delivered",
+    "opened",
+    "rejected",
+    "spam",
+    "unsub",
+    "bounced",
+    "soft-bounced",
+    "suppressed",
+)
+# Last states of the addresses we don't send emails to anymore
+SUPPRESSION_STATES = ("bounced", "rejected", "spam")
+# States of the skipped emails, they don't tell anything new about the address
+SKIPPED_STATES = ("suppressed",)
+# Seconds between refreshes of the workers suppression filters
+SUPPRESSION_REFRESH = 60
+# Summaries may be committed a while after their write date
+SUPPRESSION_OVERLAP = timedelta(minutes=5)
+
+
+def _count_column(state):
+    return "{}_count".format(state.replace("-", "_"))
+
+
+def _address_hash(address):
+    return int.from_bytes(
+        hashlib.blake2b(address.encode(), digest_size=8).digest(), "big"
+    )
+
+
+class SuppressionFilter:
+    """64 bits hashes of the suppressed addresses known by a worker"""
+
+    __slots__ = ("hashes", "refreshed", "watermark")
+
+    def __init__(self):
+        self.hashes = set()
+        self.refreshed = 0.0
+        self.watermark = None
+
+
+class MailActivityReputation(models.Model):
+    """Tracking states summary by recipient address.
+
+    Scoring an address or checking its last state must not scan all the emails
+    ever sent to it, so the counters are kept up to date as trackings change.
+    """
+
+    _name = "mail.activity.reputation"
+    _description = "MailActivity recipient reputation"
+    _rec_name = "recipient_address"
+
+    recipient_address = fields.Char(required=True, readonly=True)
+    error_count = fields.Integer(readonly=True)
+    deferred_count = fields.Integer(readonly=True)
+    sent_count = fields.Integer(readonly=True)
+    delivered_count = fields.Integer(readonly=True)
+    opened_count = fields.Integer(readonly=True)
+    rejected_count = fields.Integer(readonly=True)
+    spam_count = fields.Integer(readonly=True)
+    unsub_count = fields.Integer(readonly=True)
+    bounced_count = fields.Integer(readonly=True)
+    soft_bounced_count = fields.Integer(readonly=True)
+    suppressed_count = fields.Integer(readonly=True)
+    last_state = fields.Selection(
+        selection=lambda self: self.env["mail.activity.tracking"]
+        ._fields["state"]
+        .selection,
+        readonly=True,
+    )
+    last_state_time = fields.Datetime(readonly=True)
+    last_tracking_id = fields.Many2one(
+        comodel_name="mail.activity.tracking", readonly=True, ondelete="set null"
+    )
+    # Trackings up to this one aren't taken as the last one anymore
+    reset_tracking_id = fields.Integer(readonly=True)
+    # Sum of the state weights, decayed up to the score date
+    score_value = fields.Float(readonly=True)
+    score_date = fields.Datetime(readonly=True)
+
+    _sql_constraints = [
+        (
+            "recipient_address_unique",
+            "UNIQUE(recipient_address)",
+            "Recipient addresses must be unique!",
+        )
+    ]
+
+    def init(self):
+        # Suppression filters are refreshed from the latest written summaries
+        create_index(
+            self.env.cr,
+            "mail_activity_reputation_write_date_index",
+            self._table,
+            ["write_date"],
+        )
+
+    @api.model
+    def _find(self, email):
+        return self.search([("recipient_address", "=", email.lower())], limit=1)
+
+    def _score_get(self):
+        """Current email scores by address. The stored value only has to be
+        decayed from its date to now"""
+        half_life = self._half_life_seconds()
+        now = self.env.cr.now()
+        scores = {}
+        for reputation in self:
+            value = reputation.score_value
+            if half_life and reputation.score_date:
+                elapsed = (now - reputation.score_date).total_seconds()
+                value *= 0.5 ** (elapsed / half_life)
+            scores[reputation.recipient_address] = min(max(50.0 + value, 0.0), 100.0)
+        return scores
+
+    @api.model
+    def _half_life_seconds(self):
+        half_life = self.env["mail.activity.tracking"]._email_score_half_life()
+        return max(half_life, 0.0) * 86400
+
+    def _state_counts(self):
+        """Non zero counters by state, as expected by `email_score`"""
+        self.ensure_one()
+        return {
+            state: self[_count_column(state)]
+            for state in REPUTATION_STATES
+            if self[_count_column(state)]
+        }
+
+    @api.model
+    def _apply_deltas(self, deltas):
+        """Add the state counters deltas in a single atomic upsert.
+
+        :param deltas: {address: (state counters deltas, last tracking, score
+            delta)}, where the last tracking is a (id, state, time) tuple or
+            None. It only replaces the current one when it's not older.
+        """
+        if not deltas:
+            return
+        self.flush_model()
+        columns = [_count_column(state) for state in REPUTATION_STATES]
+        half_life = self._half_life_seconds()
+        now = self.env.cr.now()
+        rows = [
+            (
+                address,
+                *(counts.get(state, 0) for state in REPUTATION_STATES),
+                *(last or (None, None, None)),
+                score,
+                now,
+                self.env.uid,
+                now,
+                self.env.uid,
+                now,
+            )
+            for address, (counts, last, score) in deltas.items()
+        ]
+        newer = """
+            EXCLUDED.last_tracking_id IS NOT NULL AND (
+                r.reset_tracking_id IS NULL
+                OR EXCLUDED.last_tracking_id > r.reset_tracking_id
+            ) AND (
+                r.last_tracking_id IS NULL
+                OR r.last_tracking_id = EXCLUDED.last_tracking_id
+                OR COALESCE(EXCLUDED.last_state_time, '-infinity')
+                    >= COALESCE(r.last_state_time, '-infinity')
+            )
+        """
+        last_columns = ("last_tracking_id", "last_state", "last_state_time")
+        decay = "1"
+        if half_life:
+            decay = f"""power(0.5, EXTRACT(EPOCH FROM EXCLUDED.score_date
+                - COALESCE(r.score_date, EXCLUDED.score_date)) / {half_life!r})"""
+        assignments = [
+            f"{col} = COALESCE(r.{col}, 0) + EXCLUDED.{col}" for col in columns
+        ] + [
+            f"{col} = CASE WHEN {newer} THEN EXCLUDED.{col} ELSE r.{col} END"
+            for col in last_columns
+        ]
+        # The current value fades until now before the weights are added
+        assignments += [
+            f"score_value = r.score_value * {decay} + EXCLUDED.score_value",
+            "score_date = EXCLUDED.score_date",
+        ]
+        row_sql = "({})".format(", ".join(["%s"] * len(rows[0])))
+        self.env.cr.execute(
+            f"""
+            INSERT INTO mail_activity_reputation AS r (
+                recipient_address, {", ".join(columns + list(last_columns))},
+                score_value, score_date,
+                create_uid, create_date, write_uid, write_date
+            )
+            VALUES {", ".join([row_sql] * len(rows))}
+            ON CONFLICT (recipient_address) DO UPDATE SET
+                {", ".join(assignments)},
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            """,
+            [value for row in rows for value in row],
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self, addresses=None):
+        """Recompute the summaries from the trackings, for the given addresses
+        or for all of them. Run it from a shell to initialize the table:
+        ``env["mail.activity.reputation"]._rebuild()``"""
+        if addresses is not None:
+            addresses = tuple(filter(None, addresses))
+            if not addresses:
+                return
+        self.env["mail.activity.tracking"].flush_model(
+            ["recipient_address", "state", "time", "state_date"]
+        )
+        self.flush_model()
+        where = "IS NOT NULL" if addresses is None else "IN %(addresses)s"
+        columns = [_count_column(state) for state in REPUTATION_STATES]
+        counts = ", ".join(
+            f"COUNT(*) FILTER (WHERE t.state = '{state}')"
+            for state in REPUTATION_STATES
+        )
+        # States are weighted from their last change
+        weights = self.env["mail.activity.tracking"]._email_score_weights()
+        params = {
+            "addresses": addresses,
+            "skipped": SKIPPED_STATES,
+            "uid": self.env.uid,
+            "now": self.env.cr.now(),
+        }
+        weight_cases = []
+        for i, (state, weight) in enumerate(weights.items()):
+            params.update({f"state_{i}": state, f"weight_{i}": weight})
+            weight_cases.append(f"WHEN %(state_{i})s THEN %(weight_{i})s")
+        weight = f"CASE t.state {' '.join(weight_cases)} ELSE 0 END"
+        half_life = self._half_life_seconds()
+        if half_life:
+            weight += f""" * power(0.5, EXTRACT(EPOCH FROM %(now)s
+                - COALESCE(t.state_date, t.time, %(now)s)) / {half_life!r})"""
+        self.env.cr.execute(
+            f"""
+            DELETE FROM mail_activity_reputation r
+            WHERE r.recipient_address {where}
+                AND NOT EXISTS (
+                    SELECT 1 FROM mail_activity_tracking t
+                    WHERE t.recipient_address = r.recipient_address
+                )
+            """,
+            {"addresses": addresses},
+        )
+        assignments = [f"{col} = EXCLUDED.{col}" for col in columns]
+        # The last tracking ignores the skipped emails and the reset ones
+        self.env.cr.execute(
+            f"""
+            INSERT INTO mail_activity_reputation AS r (
+                recipient_address, {", ".join(columns)},
+                last_tracking_id, last_state, last_state_time,
+                score_value, score_date,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT t.recipient_address, {counts},
+                l.id, l.state, l.time,
+                COALESCE(SUM({weight}), 0), %(now)s,
+                %(uid)s, %(now)s, %(uid)s, %(now)s
+            FROM mail_activity_tracking t
+            LEFT JOIN (
+                SELECT DISTINCT ON (lt.recipient_address)
+                    lt.recipient_address, lt.id, lt.state, lt.time
+                FROM mail_activity_tracking lt
+                LEFT JOIN mail_activity_reputation lr
+                    ON lr.recipient_address = lt.recipient_address
+                WHERE lt.recipient_address {where}
+                    AND lt.state IS NOT NULL
+                    AND lt.state NOT IN %(skipped)s
+                    AND lt.id > COALESCE(lr.reset_tracking_id, 0)
+                ORDER BY lt.recipient_address, lt.time DESC NULLS LAST, lt.id DESC
+            ) AS l ON l.recipient_address = t.recipient_address
+            WHERE t.recipient_address {where}
+            GROUP BY t.recipient_address, l.id, l.state, l.time
+            ON CONFLICT (recipient_address) DO UPDATE SET
+                {", ".join(assignments)},
+                last_tracking_id = EXCLUDED.last_tracking_id,
+                last_state = EXCLUDED.last_state,
+                last_state_time = EXCLUDED.last_state_time,
+                score_value = EXCLUDED.score_value,
+                score_date = EXCLUDED.score_date,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            """,
+            params,
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _last_state_reset(self, addresses):
+        """Forget the last state of the addresses, so emails are sent to them
+        again. Their trackings until now aren't taken into account anymore,
+        but new ones will be"""
+        addresses = tuple({address.lower() for address in addresses if address})
+        if not addresses:
+            return
+        self.env["mail.activity.tracking"].flush_model(["recipient_address"])
+        self.flush_model()
+        self.env.cr.execute(
+            """
+            UPDATE mail_activity_reputation r
+            SET last_tracking_id = NULL, last_state = NULL, last_state_time = NULL,
+                reset_tracking_id = (
+                    SELECT MAX(t.id) FROM mail_activity_tracking t
+                    WHERE t.recipient_address = r.recipient_address
+                ),
+                write_uid = %s, write_date = %s
+            WHERE r.recipient_address IN %s
+            """,
+            (self.env.uid, self.env.cr.now(), addresses),
+        )
+        self.invalidate_model()
+
+    def _suppression_filter(self):
+        """Per worker suppression filter, shared by all the environments and
+        refreshed incrementally"""
+        try:
+            sfilter = self.env.registry._mail_tracking_suppression_filter
+        except AttributeError:
+            sfilter = SuppressionFilter()
+            self.env.registry._mail_tracking_suppression_filter = sfilter
+        if time.monotonic() - sfilter.refreshed > SUPPRESSION_REFRESH:
+            self._suppression_filter_refresh(sfilter)
+        return sfilter
+
+    @api.model
+    def _suppression_filter_refresh(self, sfilter):
+        """Load the suppressed addresses the first time, and then only the
+        summaries written since the previous refresh"""
+        self.flush_model(["last_state"])
+        if sfilter.watermark:
+            self.env.cr.execute(
+                """
+                SELECT recipient_address, last_state
+                FROM mail_activity_reputation
+                WHERE write_date >= %s
+                """,
+                (sfilter.watermark - SUPPRESSION_OVERLAP,),
+            )
+        else:
+            self.env.cr.execute(
+                """
+                SELECT recipient_address, last_state
+                FROM mail_activity_reputation
+                WHERE last_state IN %s
+                """,
+                (SUPPRESSION_STATES,),
+            )
+        for address, state in self.env.cr.fetchall():
+            if state in SUPPRESSION_STATES:
+                sfilter.hashes.add(_address_hash(address))
+            else:
+                sfilter.hashes.discard(_address_hash(address))
+        sfilter.watermark = self.env.cr.now()
+        sfilter.refreshed = time.monotonic()
+
+    @api.model
+    def _suppressed_addresses(self, addresses):
+        """Addresses we shouldn't send emails to. Filter hits are confirmed
+        against their summaries, as the filter may be slightly outdated"""
+        if (
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("mail_activity_tracking.suppression_disabled")
+        ):
+            return set()
+        hashes = self.sudo()._suppression_filter().hashes
+        candidates = {
+            address
+            for address in addresses
+            if address and _address_hash(address) in hashes
+        }
+        if not candidates:
+            return set()
+        last_states = self.env["mail.activity.tracking"]._email_last_tracking_states(
+            candidates
+        )
+        return {
+            address
+            for address, last in last_states.items()
+            if last["state"] in SUPPRESSION_STATES
+        }
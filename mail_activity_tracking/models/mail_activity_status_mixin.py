@@ -0,0 +1,64 @@
+from odoo import api, fields, models
+
+
+class MailActivityStatusMixin(models.AbstractModel):
+    """Stores the state of the latest email tracked on each record, so list
+    views can filter, group and sort by it. Inherit it from `mail.thread`
+    models; the values are refreshed whenever their trackings change.
+    """
+
+    _name = "mail.activity.status.mixin"
+    _description = "Mail activity status mixin"
+
+    mail_status = fields.Selection(
+        selection="_selection_mail_status",
+        string="Mail State",
+        readonly=True,
+        copy=False,
+        index=True,
+    )
+    mail_status_date = fields.Datetime(
+        string="Mail State Date",
+        readonly=True,
+        copy=False,
+        index=True,
+    )
+
+    @api.model
+    def _selection_mail_status(self):
+        return self.env["mail.activity.tracking"]._fields["state"].selection
+
+    def _mail_status_refresh(self):
+        """Set the state and time of the latest tracking of each record in a
+        single query. Records without trackings anymore are emptied"""
+        if not self.ids:
+            return
+        self.env["mail.activity.tracking"].flush_model(
+            ["mail_message_id", "state", "time"]
+        )
+        self.env["mail.message"].flush_model(["model", "res_id"])
+        self.flush_recordset(["mail_status", "mail_status_date"])
+        self.env.cr.execute(
+            f"""
+            UPDATE "{self._table}" AS r
+            SET mail_status = l.state, mail_status_date = l.time
+            FROM unnest(%s) AS d(id)
+            LEFT JOIN LATERAL (
+                SELECT t.state, t.time
+                FROM mail_activity_tracking t
+                JOIN mail_message m ON m.id = t.mail_message_id
+                WHERE m.model = %s AND m.res_id = d.id
+                ORDER BY t.time DESC NULLS LAST, t.id DESC
+                LIMIT 1
+            ) AS l ON TRUE
+            WHERE r.id = d.id
+                AND (r.mail_status IS DISTINCT FROM l.state
+                     OR r.mail_status_date IS DISTINCT FROM l.time)
+            RETURNING r.id
+            """,
+            (list(self.ids), self._name),
+        )
+        updated_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.browse(updated_ids).invalidate_recordset(
+            ["mail_status", "mail_status_date"]
+        )
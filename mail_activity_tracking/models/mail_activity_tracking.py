@@ -1,20 +1,24 @@
+import calendar
+import json
 import logging
 import re
 import time
 import urllib.parse
 import uuid
+from collections import Counter, defaultdict, namedtuple
 from datetime import datetime
-from collections import namedtuple
 from urllib.parse import urljoin
 import requests
+from markupsafe import Markup
 
 from odoo import _, api, fields, models, tools
 from odoo.exceptions import AccessError, UserError, ValidationError
 
 from ..wizards.res_config_settings import MAILGUN_TIMEOUT
+from .mail_activity_reputation import SKIPPED_STATES
 
 from odoo.fields import Command
-from odoo.tools import email_split
+from odoo.tools import SQL, email_split
 
 _logger = logging.getLogger(__name__)
 
@@ -35,6 +39,23 @@ class EventNotFoundWarning(Warning):
 
 EVENT_OPEN_DELTA = 10  # seconds
 EVENT_CLICK_DELTA = 5  # seconds
+# Opens and clicks stored as events per tracking, the rest are only counted
+EVENT_STORE_LIMIT = 50
+# Default email score half-life, in days
+SCORE_HALF_LIFE = 180
+# Replaced by each tracking image once the email body has been parsed
+TRACKING_IMG_PLACEHOLDER = "__mail_activity_tracking_img__"
+# Fields shown in the messages tracking statuses
+STATUS_FIELDS = {
+    "state",
+    "error_type",
+    "error_description",
+    "partner_id",
+    "recipient",
+    "mail_message_id",
+}
+# Cursor cache entry holding the readable trackings per user
+ALLOWED_CACHE_KEY = "mail_activity_tracking.allowed_ids"
 
 
 class MailActivityTracking(models.Model):
@@ -58,6 +79,8 @@ class MailActivityTracking(models.Model):
         string="UTC timestamp", readonly=True, digits="MailActivity Timestamp"
     )
     time = fields.Datetime(readonly=True, index=True)
+    # When the state was last set, its weight in the reputation fades from it
+    state_date = fields.Datetime(readonly=True)
     date = fields.Date(readonly=True, compute="_compute_date", store=True)
     mail_message_id = fields.Many2one(
         comodel_name="mail.message", readonly=True, index=True
@@ -88,6 +111,7 @@ class MailActivityTracking(models.Model):
             ("unsub", "Unsubscribed"),
             ("bounced", "Bounced"),
             ("soft-bounced", "Soft bounced"),
+            ("suppressed", "Suppressed"),
         ],
         index=True,
         readonly=True,
@@ -111,7 +135,10 @@ class MailActivityTracking(models.Model):
         " * The 'Bounced' status indicates that message was bounced "
         "by recipient Mail Exchange (MX) server.\n"
         " * The 'Soft bounced' status indicates that message was soft "
-        "bounced by recipient Mail Exchange (MX) server.\n",
+        "bounced by recipient Mail Exchange (MX) server.\n"
+        " * The 'Suppressed' status indicates that message was not sent "
+        "because the recipient address had already bounced or rejected "
+        "previous emails.\n",
     )
     error_smtp_server = fields.Char(string="Error SMTP server", readonly=True)
     error_type = fields.Char(readonly=True)
@@ -124,6 +151,21 @@ class MailActivityTracking(models.Model):
         inverse_name="tracking_email_id",
         readonly=True,
     )
+    # Engagement counters. They keep counting when the tracking has reached
+    # the limit of stored open and click events.
+    open_count = fields.Integer(readonly=True, default=0)
+    click_count = fields.Integer(readonly=True, default=0)
+    unique_click_urls = fields.Integer(
+        string="Unique clicked URLs", readonly=True, default=0
+    )
+    first_open = fields.Datetime(readonly=True)
+    last_open = fields.Datetime(readonly=True)
+    tracking_url_ids = fields.One2many(
+        string="Clicked URLs",
+        comodel_name="mail.activity.url",
+        inverse_name="tracking_email_id",
+        readonly=True,
+    )
     # Token isn't generated here to have compatibility with older trackings.
     # New trackings have token and older not
     token = fields.Char(
@@ -144,77 +186,325 @@ class MailActivityTracking(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
+        now = self.env.cr.now()
+        for vals in vals_list:
+            if vals.get("state"):
+                vals.setdefault("state_date", now)
         records = super().create(vals_list)
         failed_states = self.env["mail.message"].get_failed_states()
         records.filtered(lambda one: one.state in failed_states).mapped(
             "mail_message_id"
         ).write({"mail_tracking_needs_action": True})
+        records._documents_mail_status_refresh()
+        records._reputation_update()
+        records.sudo().mail_message_id._mail_tracking_version_bump()
+        records.sudo().mail_message_id._failed_counter_schedule()
+        records._tracking_update_enqueue()
         return records
 
     def write(self, vals):
+        if {"mail_message_id", "partner_id"}.intersection(vals):
+            self._allowed_tracking_cache_clear()
+        # The last tracking of an address can't be known incrementally then
+        reputation_rebuild = {"recipient", "time"}.intersection(vals)
+        addresses = set()
+        if reputation_rebuild:
+            addresses.update(self.mapped("recipient_address"))
+        if "state" in vals and "state_date" not in vals:
+            vals = dict(vals, state_date=self.env.cr.now())
+        # States are weighted from when they were set, as when rebuilding
+        old_states = {
+            tracking.id: (tracking.state, tracking.state_date or tracking.time)
+            for tracking in self
+        }
+        status_change = STATUS_FIELDS.intersection(vals)
+        # Both the previous and the new messages of the trackings change
+        status_messages = self.sudo().mail_message_id if status_change else None
+        # The previous documents lose the moved trackings
+        documents = self._documents_get() if "mail_message_id" in vals else None
         res = super().write(vals)
+        if status_change:
+            status_messages |= self.sudo().mail_message_id
+            status_messages._mail_tracking_version_bump()
+            status_messages._failed_counter_schedule()
+            self.env["mail.activity.tracking.update"].sudo()._enqueue(
+                status_messages.ids
+            )
         state = vals.get("state")
         if state and state in self.env["mail.message"].get_failed_states():
             self.mapped("mail_message_id").write({"mail_tracking_needs_action": True})
+        if {"state", "time", "mail_message_id"}.intersection(vals):
+            self._documents_mail_status_refresh(documents)
+        if reputation_rebuild:
+            addresses.update(self.mapped("recipient_address"))
+            self.env["mail.activity.reputation"].sudo()._rebuild(addresses)
+        elif "state" in vals:
+            self._reputation_update(old_states)
         return res
 
-    def _find_allowed_tracking_ids(self):
-        """Filter trackings based on related records ACLs"""
-        # Admins passby this filter
-        if not self.ids or self.env.user.has_group("base.group_system"):
-            return self.ids
-        # Override ORM to get the values directly
-        self._cr.execute(
+    def _tracking_update_enqueue(self):
+        """Push the new statuses to the open chatters"""
+        self.env["mail.activity.tracking.update"].sudo()._enqueue(
+            self.sudo().mail_message_id.ids
+        )
+
+    def _documents_get(self):
+        """Tracked documents ids by model"""
+        res_ids_by_model = defaultdict(set)
+        for message in self.sudo().mail_message_id:
+            if message.model and message.res_id:
+                res_ids_by_model[message.model].add(message.res_id)
+        return res_ids_by_model
+
+    def _documents_mail_status_refresh(self, documents=None):
+        """Refresh the latest mail status of the tracked documents, and of
+        the given ones (ids by model) that were tracked before"""
+        res_ids_by_model = self._documents_get()
+        for model_name, res_ids in (documents or {}).items():
+            res_ids_by_model[model_name].update(res_ids)
+        mixin = self.pool["mail.activity.status.mixin"]
+        for model_name, res_ids in res_ids_by_model.items():
+            if model_name in self.pool and issubclass(self.pool[model_name], mixin):
+                self.env[model_name].sudo().browse(res_ids)._mail_status_refresh()
+
+    def unlink(self):
+        self._allowed_tracking_cache_clear()
+        addresses = set(self.mapped("recipient_address"))
+        self.sudo().mail_message_id._mail_tracking_version_bump()
+        self.sudo().mail_message_id._failed_counter_schedule()
+        self._tracking_update_enqueue()
+        documents = self._documents_get()
+        res = super().unlink()
+        self.env["mail.activity.reputation"].sudo()._rebuild(addresses)
+        self.browse()._documents_mail_status_refresh(documents)
+        return res
+
+    def _reputation_update(self, old_states=None):
+        """Move the trackings from their previous state counters to the
+        current ones, in a single upsert.
+
+        :param old_states: {tracking id: (state, date)}, the previous states
+            and when they were set. Their weights are removed as faded until
+            now, the same way `_rebuild` weights them.
+        """
+        old_states = old_states or {}
+        Reputation = self.env["mail.activity.reputation"].sudo()
+        weights = self._email_score_weights()
+        half_life = Reputation._half_life_seconds()
+        now = self.env.cr.now()
+        deltas = {}
+        for tracking in self:
+            address = tracking.recipient_address
+            if not address:
+                continue
+            counts, last, score = deltas.get(address) or (Counter(), None, 0.0)
+            old_state, old_date = old_states.get(tracking.id) or (None, None)
+            if old_state:
+                counts[old_state] -= 1
+                weight = weights.get(old_state, 0.0)
+                if half_life and old_date:
+                    weight *= 0.5 ** ((now - old_date).total_seconds() / half_life)
+                score -= weight
+            if tracking.state:
+                counts[tracking.state] += 1
+                score += weights.get(tracking.state, 0.0)
+            # Skipped emails, or not sent yet, don't tell how the address is
+            if tracking.state and tracking.state not in SKIPPED_STATES:
+                candidate = (tracking.id, tracking.state, tracking.time or None)
+                if not last or (candidate[2] or datetime.min, candidate[0]) >= (
+                    last[2] or datetime.min,
+                    last[0],
+                ):
+                    last = candidate
+            deltas[address] = (counts, last, score)
+        Reputation._apply_deltas(deltas)
+
+    @api.model
+    def _message_models(self):
+        """Models the messages belong to, read by skipping through the
+        messages model index instead of scanning them"""
+        self.env["mail.message"].flush_model(["model"])
+        self.env.cr.execute(
+            """
+            WITH RECURSIVE models(model) AS (
+                (
+                    SELECT model FROM mail_message
+                    WHERE model IS NOT NULL ORDER BY model LIMIT 1
+                )
+                UNION ALL
+                SELECT (
+                    SELECT m.model FROM mail_message m
+                    WHERE m.model > models.model ORDER BY m.model LIMIT 1
+                )
+                FROM models WHERE models.model IS NOT NULL
+            )
+            SELECT model FROM models WHERE model IS NOT NULL
             """
-            SELECT id, mail_message_id, partner_id
-            FROM mail_activity_tracking WHERE id IN %s
-            """,
-            (tuple(self.ids),),
         )
-        msg_linked = self._cr.fetchall()
-        if not msg_linked:
-            return []
-        _, msg_ids, partner_ids = zip(*msg_linked, strict=True)
-        # Filter messages with their ACL rules avoiding False values fetched in the set
-        msg_ids = self.env["mail.message"]._search(
-            [("id", "in", [x for x in msg_ids if x])]
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_readable_message_query(self):
+        """SQL counterpart of the `mail.message` read rules, as a query of the
+        readable messages. Documents are only checked for the models the
+        messages belong to, each one with a subquery correlated to them"""
+        partner = self.env.user.partner_id
+        MailMessage = self.env["mail.message"].sudo()
+        alias = MailMessage._table
+        domain = []
+        if not self.env.user._is_internal():
+            domain = MailMessage._get_search_domain_share()
+        query = MailMessage._search(domain)
+        message_id = SQL.identifier(alias, "id")
+        conditions = [
+            SQL("%s = %s", SQL.identifier(alias, "author_id"), partner.id),
+            SQL(
+                """EXISTS (
+                    SELECT 1 FROM mail_message_res_partner_rel r
+                    WHERE r.mail_message_id = %s AND r.res_partner_id = %s
+                )""",
+                message_id,
+                partner.id,
+            ),
+            SQL(
+                """EXISTS (
+                    SELECT 1 FROM mail_notification n
+                    WHERE n.mail_message_id = %s AND n.res_partner_id = %s
+                )""",
+                message_id,
+                partner.id,
+            ),
+        ]
+        document_conditions = []
+        for model_name in self._message_models():
+            if model_name not in self.env:
+                continue
+            model = self.env[model_name].with_context(active_test=False)
+            if (
+                model._abstract
+                or model._table == alias
+                or not model.check_access_rights("read", raise_exception=False)
+            ):
+                continue
+            document_query = model._search([])
+            document_query.add_where(
+                SQL(
+                    "%s = %s",
+                    SQL.identifier(model._table, "id"),
+                    SQL.identifier(alias, "res_id"),
+                )
+            )
+            document_conditions.append(
+                SQL(
+                    "(%s = %s AND EXISTS (%s))",
+                    SQL.identifier(alias, "model"),
+                    model_name,
+                    document_query.subselect("1"),
+                )
+            )
+        # Notifications sent to other users aren't readable from documents
+        if document_conditions:
+            conditions.append(
+                SQL(
+                    "(%s != 'user_notification' AND (%s))",
+                    SQL.identifier(alias, "message_type"),
+                    SQL(" OR ").join(document_conditions),
+                )
+            )
+        query.add_where(SQL("(%s)", SQL(" OR ").join(conditions)))
+        return query
+
+    @api.model
+    def _get_allowed_tracking_sql(self):
+        """Trackings are readable when their message is readable or, when
+        there's no message, when their partner is readable"""
+        message_query = self._get_readable_message_query()
+        message_query.add_where(
+            SQL(
+                "%s = %s",
+                SQL.identifier(self.env["mail.message"]._table, "id"),
+                SQL.identifier(self._table, "mail_message_id"),
+            )
         )
-        partner_ids = self.env["res.partner"]._search(
-            [("id", "in", [x for x in partner_ids if x])]
+        Partner = self.env["res.partner"].with_context(active_test=False)
+        partner_query = Partner._search([])
+        partner_query.add_where(
+            SQL(
+                "%s = %s",
+                SQL.identifier(Partner._table, "id"),
+                SQL.identifier(self._table, "partner_id"),
+            )
         )
-        return [
-            track_id
-            for track_id, mail_msg_id, partner_id in msg_linked
-            if (mail_msg_id in msg_ids)  # We can read the linked message
-            or (
-                not mail_msg_id and partner_id in partner_ids
-            )  # No linked mail.message but we can read the linked partner
-            or (not any({mail_msg_id, partner_id}))  # No linked record
-        ]
+        return SQL(
+            "(EXISTS (%s) OR (%s IS NULL AND (%s IS NULL OR EXISTS (%s))))",
+            message_query.subselect("1"),
+            SQL.identifier(self._table, "mail_message_id"),
+            SQL.identifier(self._table, "partner_id"),
+            partner_query.subselect("1"),
+        )
+
+    def _skip_related_acls(self):
+        return self.env.su or self.env.user.has_group("base.group_system")
+
+    def _allowed_tracking_cache(self):
+        """Readability of the already checked trackings for the current user
+        and companies. It only lives as long as the transaction does"""
+        cr = self.env.cr
+        caches = cr.cache.get(ALLOWED_CACHE_KEY)
+        if caches is None:
+            caches = cr.cache[ALLOWED_CACHE_KEY] = {}
+
+            def clear():
+                cr.cache.pop(ALLOWED_CACHE_KEY, None)
+
+            cr.postcommit.add(clear)
+            cr.postrollback.add(clear)
+        key = (self.env.uid, tuple(self.env.context.get("allowed_company_ids", ())))
+        return caches.setdefault(key, {})
+
+    @api.model
+    def _allowed_tracking_cache_clear(self):
+        """Called whenever the links the ACLs rely on change"""
+        self.env.cr.cache.pop(ALLOWED_CACHE_KEY, None)
+
+    def _find_allowed_tracking_ids(self):
+        """Filter trackings based on related records ACLs"""
+        # Admins passby this filter
+        if not self.ids or self._skip_related_acls():
+            return self.ids
+        cache = self._allowed_tracking_cache()
+        missing_ids = [tid for tid in self.ids if tid not in cache]
+        if missing_ids:
+            allowed_ids = set(self._search([("id", "in", missing_ids)]))
+            cache.update((tid, tid in allowed_ids) for tid in missing_ids)
+        return [tid for tid in self.ids if cache[tid]]
 
     @api.model
     def _search(
         self,
-        args,
+        domain,
         offset=0,
         limit=None,
         order=None,
         access_rights_uid=None,
     ):
-        """Filter ids based on related records ACLs"""
-        allowed = super()._search(
-            args, offset, limit, order, access_rights_uid=access_rights_uid
+        """Filter ids based on related records ACLs. They're part of the query,
+        so limits and offsets are honored and nothing is read in advance"""
+        query = super()._search(
+            domain, offset, limit, order, access_rights_uid=access_rights_uid
         )
-        if not self.env.user.has_group("base.group_system"):
-            ids = self.browse(allowed)._find_allowed_tracking_ids()
-            allowed = self.browse(ids)._as_query(order)
-        return allowed
+        if not self._skip_related_acls() and not query.is_empty():
+            query.add_where(self._get_allowed_tracking_sql())
+        return query
 
     def check_access_rule(self, operation):
         """Rely on related messages ACLs"""
         super().check_access_rule(operation)
-        allowed_ids = self._search([("id", "in", self._find_allowed_tracking_ids())])
-        disallowed_ids = set(self.exists().ids).difference(set(allowed_ids))
+        if self._skip_related_acls():
+            return
+        disallowed_ids = set(self.exists().ids).difference(
+            self._find_allowed_tracking_ids()
+        )
         if not disallowed_ids:
             return
         raise AccessError(
@@ -233,7 +523,7 @@ class MailActivityTracking(models.Model):
         """Override to explicitly call check_access_rule, that is not called
         by the ORM. It instead directly fetches ir.rules and apply them.
         """
-        if not self.env.user.has_group("base.group_system"):
+        if not self._skip_related_acls():
             self.check_access_rule("read")
         return super().read(fields=fields, load=load)
 
@@ -242,38 +532,62 @@ class MailActivityTracking(models.Model):
         if not email:
             return False
         res = self.sudo()._email_last_tracking_state(email)
-        return res and res[0].get("state", "") in {
-            "rejected",
-            "error",
-            "spam",
-            "bounced",
-        }
+        return res and res[0].get("state", "") in self._email_bounced_states()
+
+    @api.model
+    def _email_bounced_states(self):
+        return {"rejected", "error", "spam", "bounced"}
 
     @api.model
     def _email_last_tracking_state(self, email):
-        return self.search_read(
-            [("recipient_address", "=", email.lower())],
-            ["state"],
-            limit=1,
-            order="time DESC",
+        last = self._email_last_tracking_states([email]).get(email.lower())
+        return [last] if last else []
+
+    @api.model
+    def _email_last_tracking_states(self, emails):
+        """Last tracking id and state by lowercase email, for all the given
+        emails at once"""
+        addresses = list({email.lower() for email in emails if email})
+        if not addresses:
+            return {}
+        reputations = (
+            self.env["mail.activity.reputation"]
+            .sudo()
+            .search([("recipient_address", "in", addresses)])
         )
+        return {
+            reputation.recipient_address: {
+                "id": reputation.last_tracking_id.id,
+                "state": reputation.last_state,
+            }
+            for reputation in reputations
+            if reputation.last_tracking_id
+        }
 
     @api.model
     def email_score_from_email(self, email):
-        if not email:
-            return 0.0
-        data = self.sudo().read_group(
-            [("recipient_address", "=", email.lower())],
-            ["recipient_address", "state"],
-            ["state"],
+        return self.email_score_from_emails([email])[email]
+
+    @api.model
+    def email_score_from_emails(self, emails):
+        """Score several emails at once. Return a dictionary by email"""
+        addresses = {email.lower() for email in emails if email}
+        reputations = (
+            self.env["mail.activity.reputation"]
+            .sudo()
+            .search([("recipient_address", "in", list(addresses))])
         )
-        mapped_data = {state["state"]: state["state_count"] for state in data}
-        return self.with_context(mt_states=mapped_data).sudo().email_score()
+        scores_by_address = reputations._score_get()
+        return {
+            email: scores_by_address.get(email.lower(), 50.0) if email else 0.0
+            for email in emails
+        }
 
     @api.model
     def _email_score_weights(self):
-        """Default email score weights. Ready to be inherited"""
-        return {
+        """Default email score weights. Ready to be inherited. They can be
+        overridden by state with a JSON system parameter"""
+        weights = {
             "error": -50.0,
             "rejected": -25.0,
             "spam": -25.0,
@@ -283,6 +597,29 @@ class MailActivityTracking(models.Model):
             "delivered": 1.0,
             "opened": 5.0,
         }
+        custom = (
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("mail_activity_tracking.score_weights")
+        )
+        if custom:
+            try:
+                weights.update(
+                    {state: float(weight) for state, weight in json.loads(custom).items()}
+                )
+            except (ValueError, TypeError, AttributeError):
+                _logger.warning("Invalid email score weights: %s", custom)
+        return weights
+
+    @api.model
+    def _email_score_half_life(self):
+        """Days after which the weight of a state change is halved in the
+        email reputation scores. 0 means they never fade"""
+        return float(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("mail_activity_tracking.score_half_life", SCORE_HALF_LIFE)
+        )
 
     def email_score(self):
         """Default email score algorimth. Ready to be inherited
@@ -291,6 +628,7 @@ class MailActivityTracking(models.Model):
         - Bad reputation: Value between 0 and 50.0
         - Unknown reputation: Value 50.0
         - Good reputation: Value between 50.0 and 100.0
+        Unlike the reputation summaries score, old states don't fade here.
         """
         weights = self._email_score_weights()
         score = 50.0
@@ -328,11 +666,15 @@ class MailActivityTracking(models.Model):
         for email in self:
             email.date = fields.Date.to_string(fields.Date.from_string(email.time))
 
-    def _get_mail_tracking_img(self):
+    @api.model
+    def _get_mail_tracking_base_url(self):
         m_config = self.env["ir.config_parameter"]
-        base_url = m_config.get_param("mail_activity_tracking.base.url") or m_config.get_param(
+        return m_config.get_param("mail_activity_tracking.base.url") or m_config.get_param(
             "web.base.url"
         )
+
+    def _get_mail_tracking_img(self, base_url=None):
+        base_url = base_url or self._get_mail_tracking_base_url()
         if self.token:
             path_url = (
                 f"mail/tracking/open/{self.env.cr.dbname}/{self.id}/{self.token}/"
@@ -351,10 +693,10 @@ class MailActivityTracking(models.Model):
             recipients.append(event.recipient_address)
         else:
             recipients = [x for x in self.mapped("recipient_address") if x]
-        for recipient in recipients:
-            self.env["res.partner"].search(
-                [("email", "=ilike", recipient)]
-            ).email_bounced_set(self, reason, event=event)
+        partners_by_email = self.env["res.partner"]._email_partners_get(recipients)
+        self.env["res.partner"].union(*partners_by_email.values()).email_bounced_set(
+            self, reason, event=event
+        )
 
     def smtp_error(self, mail_server, smtp_server, exception):
         values = {"state": "error"}
@@ -380,18 +722,53 @@ class MailActivityTracking(models.Model):
             self.sudo()._partners_email_bounced_set("error")
         self.sudo().write(values)
 
+    def _suppressed_set(self):
+        """Mark the trackings sent to suppressed addresses, so they're skipped
+        before reaching the SMTP server. Return them"""
+        suppressed = self.env["mail.activity.reputation"]._suppressed_addresses(
+            self.mapped("recipient_address")
+        )
+        trackings = self.filtered(lambda t: t.recipient_address in suppressed)
+        if trackings:
+            trackings.sudo().write(
+                {
+                    "state": "suppressed",
+                    "error_type": "suppressed",
+                    "error_description": "The recipient address has already "
+                    "bounced or rejected previous emails",
+                }
+            )
+        return trackings
+
     def tracking_img_add(self, email):
         self.ensure_one()
-        tracking_url = self._get_mail_tracking_img()
-        if tracking_url:
+        self._tracking_imgs_add([email])
+
+    def _tracking_imgs_add(self, emails):
+        """Add each tracking image to its email, in the same order. Emails
+        usually share their body, so every distinct one is parsed only once
+        and the images are then put in place of a placeholder"""
+        base_url = self._get_mail_tracking_base_url()
+        templates = {}
+        for tracking, email in zip(self, emails, strict=True):
             content = email.get("body", "")
-            content = re.sub(
-                r'<img[^>]*data-odoo-tracking-email=["\'][0-9]*["\'][^>]*>', "", content
-            )
-            body = tools.append_content_to_html(
-                content, tracking_url, plaintext=False, container_tag="div"
+            template = templates.get(content)
+            if template is None:
+                template = templates[content] = tools.append_content_to_html(
+                    re.sub(
+                        r'<img[^>]*data-odoo-tracking-email=["\'][0-9]*["\'][^>]*>',
+                        "",
+                        content,
+                    ),
+                    TRACKING_IMG_PLACEHOLDER,
+                    plaintext=False,
+                    container_tag="div",
+                )
+            # Markup.replace would escape the image tag
+            body = str(template).replace(
+                TRACKING_IMG_PLACEHOLDER, tracking._get_mail_tracking_img(base_url)
             )
-            email["body"] = body
+            email["body"] = Markup(body) if isinstance(template, Markup) else body
 
     def _message_partners_check(self, message, message_id):
         if not self.mail_message_id.exists():  # pragma: no cover
@@ -454,17 +831,118 @@ class MailActivityTracking(models.Model):
             concurrent_event_ids = m_event.search(domain)
         return concurrent_event_ids
 
+    @api.model
+    def _event_store_limit(self):
+        """Max open and click events stored per tracking. 0 means no limit"""
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("mail_activity_tracking.event_store_limit", EVENT_STORE_LIMIT)
+        )
+
+    def _engagement_stored(self):
+        """Whether a new open or click event should be stored"""
+        self.ensure_one()
+        limit = self._event_store_limit()
+        return not limit or self.open_count + self.click_count < limit
+
+    def _concurrent_engagement(self, event_type, metadata):
+        """Counter based concurrency check, for when the events aren't stored"""
+        self.ensure_one()
+        ts = metadata.get("timestamp", time.time())
+        if event_type == "open":
+            delta, last = EVENT_OPEN_DELTA, self.last_open
+        else:
+            delta = EVENT_CLICK_DELTA
+            last = self.tracking_url_ids.filtered(
+                lambda x: x.url == (metadata.get("url") or "")
+            ).last_click
+        if not last:
+            return False
+        return abs(float(ts) - calendar.timegm(last.timetuple())) <= delta
+
+    def _engagement_count(self, event_type, metadata):
+        """Atomically count an open or a click"""
+        self.ensure_one()
+        ts = metadata.get("timestamp", time.time())
+        dt = datetime.utcfromtimestamp(float(ts))
+        new_url = False
+        if event_type == "click":
+            self.env.cr.execute(
+                """
+                INSERT INTO mail_activity_url AS u
+                    (tracking_email_id, url, click_count, first_click, last_click,
+                     create_uid, create_date, write_uid, write_date)
+                VALUES (%(id)s, %(url)s, 1, %(dt)s, %(dt)s,
+                        %(uid)s, now() at time zone 'UTC',
+                        %(uid)s, now() at time zone 'UTC')
+                ON CONFLICT (tracking_email_id, url) DO UPDATE SET
+                    click_count = COALESCE(u.click_count, 0) + 1,
+                    first_click = LEAST(u.first_click, EXCLUDED.first_click),
+                    last_click = GREATEST(u.last_click, EXCLUDED.last_click),
+                    write_date = EXCLUDED.write_date
+                RETURNING (xmax = 0)
+                """,
+                {
+                    "id": self.id,
+                    "url": metadata.get("url") or "",
+                    "dt": dt,
+                    "uid": self.env.uid,
+                },
+            )
+            new_url = self.env.cr.fetchone()[0]
+            self.env["mail.activity.url"].invalidate_model()
+        # A click also means that the email has been opened
+        self.env.cr.execute(
+            """
+            UPDATE mail_activity_tracking SET
+                open_count = COALESCE(open_count, 0) + %s,
+                click_count = COALESCE(click_count, 0) + %s,
+                unique_click_urls = COALESCE(unique_click_urls, 0) + %s,
+                first_open = LEAST(first_open, %s),
+                last_open = GREATEST(last_open, %s)
+            WHERE id = %s
+            """,
+            (
+                int(event_type == "open"),
+                int(event_type == "click"),
+                int(new_url),
+                dt,
+                dt,
+                self.id,
+            ),
+        )
+        self.invalidate_recordset(
+            [
+                "open_count",
+                "click_count",
+                "unique_click_urls",
+                "first_open",
+                "last_open",
+                "tracking_url_ids",
+            ]
+        )
+
     def event_create(self, event_type, metadata):
         event_ids = self.env["mail.activity.event"]
         for tracking_email in self:
             other_ids = tracking_email._concurrent_events(event_type, metadata)
+            store_event = True
+            if event_type in {"open", "click"}:
+                store_event = tracking_email._engagement_stored()
+                if not other_ids and not store_event:
+                    other_ids = tracking_email._concurrent_engagement(
+                        event_type, metadata
+                    )
             if not other_ids:
+                if event_type in {"open", "click"}:
+                    tracking_email._engagement_count(event_type, metadata)
                 vals = tracking_email._event_prepare(event_type, metadata)
-                if vals:
+                if vals and store_event:
                     events = event_ids.sudo().create(vals)
                     if event_type in {"hard_bounce", "spam", "reject"}:
                         for event in events:
-                            self.sudo()._partners_email_bounced_set(
+                            tracking_email.sudo()._partners_email_bounced_set(
                                 event_type, event=event
                             )
                     event_ids += events
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+# Tracking changes are pushed at most once per window
+UPDATE_WINDOW = timedelta(seconds=5)
+# Messages notified by each run of the scheduled action
+UPDATE_BATCH = 5000
+# Cursor precommit data flagging the transactions that already triggered
+TRIGGERED_KEY = "mail_activity_tracking.update_triggered"
+
+
+class MailActivityTrackingUpdate(models.Model):
+    """Messages whose tracking statuses changed since the last notification.
+
+    Pushing every open or delivery as it comes floods the bus when a mailing
+    is opened by many recipients at once, so the changed messages are queued
+    here and pushed together by a scheduled action, at most once per window.
+    """
+
+    _name = "mail.activity.tracking.update"
+    _description = "MailActivity pending tracking status notification"
+    _order = "id"
+
+    mail_message_id = fields.Many2one(
+        comodel_name="mail.message", required=True, readonly=True, ondelete="cascade"
+    )
+
+    _sql_constraints = [
+        (
+            "mail_message_id_unique",
+            "UNIQUE(mail_message_id)",
+            "Messages are only queued once!",
+        )
+    ]
+
+    @api.model
+    def _enqueue(self, message_ids):
+        """Queue the messages and schedule their notification, once per
+        transaction. Due triggers are all handled by the same run, even when
+        the queue wasn't empty: its rows may be about to be notified"""
+        message_ids = tuple(filter(None, message_ids))
+        if not message_ids:
+            return
+        cr = self.env.cr
+        now = cr.now()
+        cr.execute(
+            """
+            INSERT INTO mail_activity_tracking_update (
+                mail_message_id, create_uid, create_date, write_uid, write_date
+            )
+            SELECT id, %s, %s, %s, %s FROM mail_message WHERE id IN %s
+            ON CONFLICT (mail_message_id) DO NOTHING
+            """,
+            (self.env.uid, now, self.env.uid, now, message_ids),
+        )
+        precommit_data = cr.precommit.data
+        if precommit_data.get(TRIGGERED_KEY):
+            return
+        precommit_data[TRIGGERED_KEY] = True
+        self.env.ref(
+            "mail_activity_tracking.ir_cron_mail_activity_tracking_update"
+        ).sudo()._trigger(at=now + UPDATE_WINDOW)
+
+    @api.model
+    def _notified_partners(self, messages):
+        """Partners watching the messages: their authors and the users
+        following their documents, by partner"""
+        message_ids_by_partner = {}
+        for message in messages:
+            message_ids_by_partner.setdefault(message.author_id, set()).add(message.id)
+        messages_by_model = messages.filtered(lambda m: m.model and m.res_id).grouped(
+            "model"
+        )
+        for model, model_messages in messages_by_model.items():
+            followers = self.env["mail.followers"].search(
+                [
+                    ("res_model", "=", model),
+                    ("res_id", "in", model_messages.mapped("res_id")),
+                ]
+            )
+            partners_by_res_id = {}
+            for follower in followers:
+                partners_by_res_id.setdefault(follower.res_id, set()).add(
+                    follower.partner_id
+                )
+            for message in model_messages:
+                for partner in partners_by_res_id.get(message.res_id, ()):
+                    message_ids_by_partner.setdefault(partner, set()).add(message.id)
+        return {
+            partner: message_ids
+            for partner, message_ids in message_ids_by_partner.items()
+            if partner and any(not user.share for user in partner.user_ids)
+        }
+
+    @api.model
+    def _cron_notify(self, limit=UPDATE_BATCH):
+        """Push the changed messages of the window, one payload per partner"""
+        pending = self.search([], limit=limit)
+        message_ids_by_partner = self._notified_partners(pending.mail_message_id)
+        if message_ids_by_partner:
+            self.env["bus.bus"]._sendmany(
+                [
+                    (
+                        partner,
+                        "mail_activity_tracking/statuses",
+                        {"message_ids": sorted(message_ids)},
+                    )
+                    for partner, message_ids in message_ids_by_partner.items()
+                ]
+            )
+        pending.unlink()
+        if len(pending) == limit:
+            self.env.ref(
+                "mail_activity_tracking.ir_cron_mail_activity_tracking_update"
+            )._trigger()
@@ -0,0 +1,31 @@
+from odoo import fields, models
+
+
+class MailActivityUrl(models.Model):
+    """Clicked URLs of a tracking email. Clicks are counted here even when the
+    tracking already stores as many click events as allowed"""
+
+    _name = "mail.activity.url"
+    _order = "last_click desc"
+    _rec_name = "url"
+    _description = "MailActivity clicked URL"
+
+    tracking_email_id = fields.Many2one(
+        string="Message",
+        readonly=True,
+        required=True,
+        ondelete="cascade",
+        comodel_name="mail.activity.tracking",
+    )
+    url = fields.Char(string="Clicked URL", readonly=True)
+    click_count = fields.Integer(readonly=True, default=0)
+    first_click = fields.Datetime(readonly=True)
+    last_click = fields.Datetime(readonly=True)
+
+    _sql_constraints = [
+        (
+            "tracking_url_unique",
+            "UNIQUE(tracking_email_id, url)",
+            "Clicked URLs must be unique per tracking email!",
+        )
+    ]
@@ -1,13 +1,39 @@
-from odoo import api, models, tools
+from odoo import api, models
+
+# Set to the id of a transaction started once the aliases changes are
+# committed, so every worker reloads them
+ALIASES_SEQUENCE = "mail_alias_tracking_version_seq"
+# Cursor cache entry holding the aliases version, None once changed
+ALIASES_VERSION_KEY = "mail_activity_tracking.aliases_version"
 
 
 class MailAlias(models.Model):
     _inherit = "mail.alias"
 
+    def init(self):
+        super().init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {ALIASES_SEQUENCE}")
+
     @api.model
-    @tools.ormcache()
     def get_aliases(self):
-        """We want to discard these addresses for trackings"""
+        """We want to discard these addresses for trackings. Each worker keeps
+        them until they change, instead of relying on the registry caches"""
+        version = self._aliases_version()
+        if version is None:
+            # Changed by this transaction, not committed yet
+            return frozenset(self._aliases_compute())
+        version, visible = version
+        cached = getattr(self.env.registry, "_mail_tracking_aliases", None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        aliases = frozenset(self._aliases_compute())
+        # Snapshots taken before the change was committed read the old aliases
+        if visible:
+            self.env.registry._mail_tracking_aliases = (version, aliases)
+        return aliases
+
+    @api.model
+    def _aliases_compute(self):
         aliases = {
             x["display_name"]
             for x in self.search_read([("alias_name", "!=", False)], ["display_name"])
@@ -19,19 +45,61 @@ class MailAlias(models.Model):
         )
         return aliases | catchall_emails | default_from_emails
 
+    @api.model
+    def _aliases_version(self):
+        """Aliases version, read once per transaction, and whether the
+        transaction setting it is visible from this transaction snapshot"""
+        cr = self.env.cr
+        if ALIASES_VERSION_KEY not in cr.cache:
+            cr.execute(
+                f"""
+                SELECT last_value,
+                    txid_visible_in_snapshot(last_value, txid_current_snapshot())
+                FROM {ALIASES_SEQUENCE}
+                """
+            )
+            cr.cache[ALIASES_VERSION_KEY] = cr.fetchone()
+
+            def clear():
+                cr.cache.pop(ALIASES_VERSION_KEY, None)
+
+            cr.postcommit.add(clear)
+            cr.postrollback.add(clear)
+        return cr.cache[ALIASES_VERSION_KEY]
+
+    @api.model
+    def _aliases_changed(self):
+        """Reload the aliases in this transaction, and in every worker once
+        it's committed"""
+        self._aliases_version()
+        cr = self.env.cr
+        cr.cache[ALIASES_VERSION_KEY] = None
+        if cr.postcommit.data.get(ALIASES_VERSION_KEY):
+            return
+        cr.postcommit.data[ALIASES_VERSION_KEY] = True
+        registry = self.env.registry
+
+        def bump():
+            with registry.cursor() as bump_cr:
+                bump_cr.execute(
+                    "SELECT setval(%s, txid_current())", (ALIASES_SEQUENCE,)
+                )
+
+        cr.postcommit.add(bump)
+
     @api.model_create_multi
     def create(self, vals_list):
         res = super().create(vals_list)
-        self.env.registry.clear_cache()
+        self._aliases_changed()
         return res
 
     def write(self, vals):
         res = super().write(vals)
-        if "alias_name" in vals:
-            self.env.registry.clear_cache()
+        if {"alias_name", "alias_domain_id"}.intersection(vals):
+            self._aliases_changed()
         return res
 
     def unlink(self):
         res = super().unlink()
-        self.env.registry.clear_cache()
+        self._aliases_changed()
         return res
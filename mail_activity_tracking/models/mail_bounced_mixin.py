@@ -1,4 +1,6 @@
-from odoo import fields, models
+from collections import defaultdict
+
+from odoo import api, fields, models
 
 
 class MailBouncedMixin(models.AbstractModel):
@@ -23,18 +25,58 @@ class MailBouncedMixin(models.AbstractModel):
         partners = self.filtered(lambda r: not r.email_bounced)
         return partners.write({"email_bounced": True})
 
-    def write(self, vals):
+    @api.model
+    def _email_bounced_vals(self, vals_list):
+        """Set the bounced flag in the values with an email, reading the last
+        tracking states of all of them at once. Return the last tracking id
+        of the bounced emails"""
         email_field = self._primary_email
-        if email_field not in vals:
-            return super().write(vals)
-        email = vals[email_field].lower() if vals[email_field] else False
-        mte_obj = self.env["mail.activity.tracking"]
-        vals["email_bounced"] = mte_obj.email_is_bounced(email)
-        if vals["email_bounced"]:
-            res = mte_obj._email_last_tracking_state(email)
-            tracking = mte_obj.browse(res[0].get("id"))
+        mte_obj = self.env["mail.activity.tracking"].sudo()
+        last_states = mte_obj._email_last_tracking_states(
+            [vals[email_field] for vals in vals_list if vals.get(email_field)]
+        )
+        bounced_states = mte_obj._email_bounced_states()
+        bounced = {
+            email: last["id"]
+            for email, last in last_states.items()
+            if last["state"] in bounced_states
+        }
+        for vals in vals_list:
+            if email_field in vals:
+                email = vals[email_field].lower() if vals[email_field] else False
+                vals["email_bounced"] = email in bounced
+        return bounced
+
+    def _email_bounced_notify(self, bounced):
+        """Call `email_bounced_set` once for the records sharing each bounced
+        tracking"""
+        if not bounced:
+            return
+        records_by_tracking = defaultdict(lambda: self.browse())
+        for record in self:
+            email = (record[self._primary_email] or "").lower()
+            if email in bounced:
+                records_by_tracking[bounced[email]] |= record
+        trackings = (
+            self.env["mail.activity.tracking"].sudo().browse(list(records_by_tracking))
+        )
+        for tracking in trackings:
             event = tracking.tracking_event_ids[:1]
-            self.with_context(write_loop=True).email_bounced_set(
-                tracking, event.error_details, event
-            )
-        return super().write(vals)
+            records_by_tracking[tracking.id].with_context(
+                write_loop=True
+            ).email_bounced_set(tracking, event.error_details, event)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        bounced = self._email_bounced_vals(vals_list)
+        records = super().create(vals_list)
+        records._email_bounced_notify(bounced)
+        return records
+
+    def write(self, vals):
+        if self._primary_email not in vals:
+            return super().write(vals)
+        bounced = self._email_bounced_vals([vals])
+        res = super().write(vals)
+        self._email_bounced_notify(bounced)
+        return res
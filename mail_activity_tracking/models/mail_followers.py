@@ -0,0 +1,19 @@
+from odoo import api, models
+
+
+class MailFollowers(models.Model):
+    _inherit = "mail.followers"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """The trackings readable by the users rely on the followers"""
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().unlink()
@@ -33,8 +33,13 @@ class MailMail(models.Model):
             method to extract the `mail.activity.tracking` record ID and set the `X-Odoo-MailTracking-ID` header.
         """
         emails = super()._prepare_outgoing_list(recipients_follower_status)
-        for email in emails:
-            vals = self._tracking_email_value(email)
-            tracking_email = self.env["mail.activity.tracking"].sudo().with_context(res_model=self.model, record_id=self.res_id).create(vals)
-            tracking_email.tracking_img_add(email)
+        if not emails:
+            return emails
+        tracking_emails = (
+            self.env["mail.activity.tracking"]
+            .sudo()
+            .create([self._tracking_email_value(email) for email in emails])
+        )
+        tracking_emails._tracking_imgs_add(emails)
+        tracking_emails._suppressed_set()
         return emails
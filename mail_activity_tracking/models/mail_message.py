@@ -1,8 +1,28 @@
+from collections import defaultdict
 from email.utils import getaddresses
 
 from odoo import _, api, fields, models
 from odoo.osv import expression
 from odoo.tools import email_split
+from odoo.tools.lru import LRU
+from odoo.tools.sql import create_index
+
+# Messages tracking statuses kept in memory by each worker
+STATUS_CACHE_SIZE = 8192
+# Non transactional, so versions are never given twice
+STATUS_VERSION_SEQUENCE = "mail_message_tracking_version_seq"
+# Tracking statuses sent to the web client, by code
+STATUS_CODES = ("unknown", "waiting", "error", "sent", "delivered", "opened")
+# Recipients sent by message, the next ones are only counted
+STATUS_COLLAPSE_THRESHOLD = 20
+# Recipient fields shown in the messages tracking statuses
+STATUS_RECIPIENT_FIELDS = {
+    "email_cc",
+    "email_to",
+    "partner_ids",
+    "notified_partner_ids",
+    "notification_ids",
+}
 
 
 class MailMessage(models.Model):
@@ -26,11 +46,76 @@ class MailMessage(models.Model):
         compute="_compute_is_failed_message",
         search="_search_is_failed_message",
     )
+    # Changes whenever the tracking statuses of the message may change
+    mail_tracking_version = fields.Integer(readonly=True, copy=False)
+
+    def init(self):
+        super().init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {STATUS_VERSION_SEQUENCE}")
+        # Failed messages searches start from the few ones needing an action
+        create_index(
+            self.env.cr,
+            "mail_message_mail_tracking_needs_action_index",
+            self._table,
+            ["mail_tracking_needs_action"],
+            where="mail_tracking_needs_action",
+        )
+
+    def write(self, vals):
+        if {"author_id", "partner_ids", "model", "res_id", "message_type"}.intersection(
+            vals
+        ):
+            self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        failed_change = {"mail_tracking_needs_action", "author_id"}.intersection(vals)
+        if failed_change:
+            self._failed_counter_schedule()
+        res = super().write(vals)
+        if failed_change:
+            self._failed_counter_schedule()
+        if STATUS_RECIPIENT_FIELDS.intersection(vals):
+            self._mail_tracking_version_bump()
+        return res
+
+    def _failed_counter_schedule(self):
+        """Refresh the failed messages counters of the involved partners"""
+        messages = self.sudo()
+        self.env["mail.activity.failed.counter"]._schedule(
+            (messages.author_id | messages.notification_ids.res_partner_id).ids
+        )
+
+    def _mail_tracking_version_bump(self):
+        """Outdate the cached tracking statuses of the messages"""
+        ids = tuple(filter(None, self.ids))
+        if not ids:
+            return
+        self.env.cr.execute(
+            """
+            UPDATE mail_message SET mail_tracking_version = nextval(%s)
+            WHERE id IN %s
+            """,
+            (STATUS_VERSION_SEQUENCE, ids),
+        )
+        self.browse(ids).invalidate_recordset(["mail_tracking_version"])
+
+    def _mail_tracking_status_cache(self):
+        """Per worker tracking statuses cache, shared by all the environments"""
+        try:
+            return self.env.registry._mail_tracking_status_cache
+        except AttributeError:
+            cache = self.env.registry._mail_tracking_status_cache = LRU(
+                STATUS_CACHE_SIZE
+            )
+            return cache
+
+    def unlink(self):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        self._failed_counter_schedule()
+        return super().unlink()
 
     @api.model
     def get_failed_states(self):
         """The 'failed' states of the message"""
-        return {"error", "rejected", "spam", "bounced", "soft-bounced"}
+        return {"error", "rejected", "spam", "bounced", "soft-bounced", "suppressed"}
 
     @api.depends(
         "mail_tracking_needs_action",
@@ -40,41 +125,45 @@ class MailMessage(models.Model):
         "mail_tracking_ids.state",
     )
     def _compute_is_failed_message(self):
-        """Compute 'is_failed_message' field for the active user"""
-        failed_states = self.get_failed_states()
-        for message in self:
-            needs_action = message.mail_tracking_needs_action
-            involves_me = self.env.user.partner_id in (
-                message.author_id | message.notification_ids.res_partner_id
-            )
-            has_failed_trackings = failed_states.intersection(
-                message.mapped("mail_tracking_ids.state")
-            )
-            message.is_failed_message = bool(
-                needs_action and involves_me and has_failed_trackings
+        """Compute 'is_failed_message' field for the active user, with a single
+        query for all the messages"""
+        message_ids = [message_id for message_id in self.ids if message_id]
+        failed_ids = set()
+        if message_ids:
+            failed_ids = set(
+                self.sudo()
+                .search(
+                    [("id", "in", message_ids), ("is_failed_message", "=", True)]
+                )
+                .ids
             )
+        for message in self:
+            message.is_failed_message = message.id in failed_ids
 
     def _search_is_failed_message(self, operator, value):
         """
             Searches for messages marked as failed for the active user.
             Note that `notificacion_ids` is a record that changes when the user marks the message as read.
+            Trackings and notifications are checked with subqueries, so only
+            the messages needing an action are considered.
         """
-        notification_partner_ids = self.search(
-            [("notification_ids.res_partner_id", "=", self.env.user.partner_id.id)]
-        )
-        return expression.normalize_domain(
+        partner_id = self.env.user.partner_id.id
+        domain = expression.normalize_domain(
             [
+                ("mail_tracking_needs_action", "=", True),
                 (
-                    "mail_tracking_ids.state",
-                    "in" if value else "not in",
-                    list(self.get_failed_states()),
+                    "mail_tracking_ids",
+                    "any",
+                    [("state", "in", list(self.get_failed_states()))],
                 ),
-                ("mail_tracking_needs_action", "=", True),
                 "|",
-                ("author_id", "=", self.env.user.partner_id.id),
-                ("id", "in", notification_partner_ids.ids),
+                ("author_id", "=", partner_id),
+                ("notification_ids", "any", [("res_partner_id", "=", partner_id)]),
             ]
         )
+        if (operator == "=") == bool(value):
+            return domain
+        return ["!"] + domain
 
     def _mail_tracking_status_map_get(self):
         """Map tracking states to be used in chatter"""
@@ -90,6 +179,7 @@ class MailMessage(models.Model):
             "unsub": "opened",
             "bounced": "error",
             "soft-bounced": "error",
+            "suppressed": "error",
         }
 
     def _partner_tracking_status_get(self, tracking_email):
@@ -116,26 +206,113 @@ class MailMessage(models.Model):
     @api.model
     def _get_error_description(self, tracking):
         """Translations of error descriptions for use in QWeb templates."""
-        description = {"no_recipient": _("The partner doesn't have a defined email")}
+        description = {
+            "no_recipient": _("The partner doesn't have a defined email"),
+            "suppressed": _(
+                "The recipient address has already bounced or rejected "
+                "previous emails"
+            ),
+        }
         return description.get(tracking.error_type, tracking.error_description)
 
     def mail_tracking_status(self):
         """Generates a complete status tracking of the messages by partner"""
         self.ensure_one()
-        tracking_delta = 0
-        partner_trackings = []
-        partners_already = self.env["res.partner"]
-        partners = self.env["res.partner"]
+        return self.mail_tracking_status_multi()[self.id]
+
+    def mail_tracking_status_multi(self):
+        """Tracking status by partner of all the messages, by message id.
+        They're served from the cache while the message version is the same.
+        Recipients are found among the partners the user can read, so they're
+        cached by user and companies"""
+        cache = self._mail_tracking_status_cache()
+        scope = (
+            self.env.lang,
+            self.env.uid,
+            tuple(self.env.context.get("allowed_company_ids", ())),
+        )
+        statuses = {}
+        missing = self.browse()
+        for message in self:
+            cached = cache.get((message.id, message.mail_tracking_version, scope))
+            if cached is None:
+                missing |= message
+            else:
+                statuses[message.id] = [dict(status) for status in cached]
+        if missing:
+            computed = missing._mail_tracking_status_compute()
+            for message in missing:
+                key = (message.id, message.mail_tracking_version, scope)
+                cache[key] = tuple(dict(status) for status in computed[message.id])
+            statuses.update(computed)
+        return statuses
+
+    def _mail_tracking_status_compute(self):
+        """Tracking status by partner of all the messages, by message id. The
+        trackings, partners and aliases of all of them are read at once"""
+        trackings_by_message = defaultdict(list)
         trackings = (
             self.env["mail.activity.tracking"]
             .sudo()
-            .search([("mail_message_id", "=", self.id)])
+            .search([("mail_message_id", "in", self.ids)])
         )
+        for tracking in trackings:
+            trackings_by_message[tracking.mail_message_id.id].append(tracking)
+        aliases = self.env["mail.alias"].get_aliases()
         # String to List
-        email_cc_list = self._drop_aliases(email_split(self.email_cc))
-        email_to_list = self._drop_aliases(email_split(self.email_to))
-        # Search related partners recipients
-        partners |= partners.search([("email", "in", email_cc_list + email_to_list)])
+        emails_by_message = {
+            message.id: (
+                self._drop_aliases(email_split(message.email_cc), aliases),
+                self._drop_aliases(email_split(message.email_to), aliases),
+            )
+            for message in self
+        }
+        # Search related partners recipients of all the messages
+        all_emails = {
+            email
+            for email_cc_list, email_to_list in emails_by_message.values()
+            for email in email_cc_list + email_to_list
+        }
+        partners_by_email = defaultdict(lambda: self.env["res.partner"])
+        if all_emails:
+            for partner in self.env["res.partner"].search(
+                [("email", "in", list(all_emails))]
+            ):
+                partners_by_email[partner.email] |= partner
+        # Default tracking values
+        tracking_unknown_values = {
+            "status": "unknown",
+            "status_human": self._partner_tracking_status_human_get("unknown"),
+            "error_type": False,
+            "error_description": False,
+            "tracking_id": False,
+        }
+        return {
+            message.id: message._mail_tracking_status_prepare(
+                trackings_by_message[message.id],
+                *emails_by_message[message.id],
+                partners_by_email,
+                tracking_unknown_values,
+            )
+            for message in self
+        }
+
+    def _mail_tracking_status_prepare(
+        self,
+        trackings,
+        email_cc_list,
+        email_to_list,
+        partners_by_email,
+        tracking_unknown_values,
+    ):
+        """Status tracking of the message by partner, from prefetched data"""
+        self.ensure_one()
+        tracking_delta = 0
+        partner_trackings = []
+        partners_already = self.env["res.partner"]
+        partners = self.env["res.partner"].union(
+            *(partners_by_email[email] for email in email_cc_list + email_to_list)
+        )
         # Operate over set's instead of lists
         email_cc_list = set(email_cc_list)
         email_to_list = set(email_to_list) - email_cc_list
@@ -169,14 +346,6 @@ class MailMessage(models.Model):
             partners |= self.notified_partner_ids
         # Discard partner recipients already included
         partners -= partners_already
-        # Default tracking values
-        tracking_unknown_values = {
-            "status": "unknown",
-            "status_human": self._partner_tracking_status_human_get("unknown"),
-            "error_type": False,
-            "error_description": False,
-            "tracking_id": False,
-        }
         # Process tracking status of partner recipients without tracking
         for partner in partners:
             # Discard 'To' with partner
@@ -216,8 +385,9 @@ class MailMessage(models.Model):
         return partner_trackings
 
     @api.model
-    def _drop_aliases(self, mail_list):
-        aliases = self.env["mail.alias"].get_aliases()
+    def _drop_aliases(self, mail_list, aliases=None):
+        if aliases is None:
+            aliases = self.env["mail.alias"].get_aliases()
 
         def _filter_alias(email):
             email_wn = getaddresses([email])[0][1]
@@ -229,29 +399,78 @@ class MailMessage(models.Model):
     def _prepare_dict_failed_message(self):
         """Prepare values for use by the chatter widget."""
         self.ensure_one()
+        return self._prepare_dict_failed_messages()[0]
+
+    def _prepare_dict_failed_messages(self):
+        """Values of `_prepare_dict_failed_message` for all the messages, in
+        the same order. The failed recipients names are read at once"""
+        failed_states = self.get_failed_states()
         failed_trackings = self.mail_tracking_ids.filtered(
-            lambda x: x.state in self.get_failed_states()
+            lambda x: x.state in failed_states
         )
-        if not failed_trackings or not self.mail_tracking_needs_action:
-            return
-        failed_partner = failed_trackings.mapped("partner_id")
-        failed_recipients = failed_partner.read(["display_name"])
-        return {
-            "id": self.id,
-            "date": self.date,
-            "body": self.body,
-            "failed_recipients": failed_recipients,
+        recipients = {
+            vals["id"]: vals
+            for vals in failed_trackings.partner_id.read(["display_name"])
         }
+        trackings_by_message = failed_trackings.grouped("mail_message_id")
+        res = []
+        for message in self:
+            trackings = trackings_by_message.get(message)
+            if not trackings or not message.mail_tracking_needs_action:
+                res.append(None)
+                continue
+            res.append(
+                {
+                    "id": message.id,
+                    "date": message.date,
+                    "body": message.body,
+                    "failed_recipients": [
+                        recipients[partner.id] for partner in trackings.partner_id
+                    ],
+                }
+            )
+        return res
 
     def get_failed_messages(self):
         """
             Returns a list of failed messages for use by the failed_messages widget.
         """
+        messages = self.search([("id", "in", self.ids)], order="date desc, id desc")
+        return messages._prepare_dict_failed_messages()
+
+    @api.model
+    def _failed_messages_domain(self, model, res_id):
+        """Failed messages of a record the current user has to review"""
         return [
-            msg._prepare_dict_failed_message()
-            for msg in self.sorted("date", reverse=True)
+            ("model", "=", model),
+            ("res_id", "=", res_id),
+            ("is_failed_message", "=", True),
         ]
 
+    @api.model
+    def _failed_messages_search(self, model, res_id, before=None, limit=None):
+        """Failed messages of a record needing an action, newest first. Pages
+        follow the ``before`` (date, id) pair of the last message shown in
+        that order, so they don't shift as messages fail, get reviewed or get
+        deleted"""
+        domain = self._failed_messages_domain(model, res_id)
+        if before:
+            date, message_id = before
+            date = fields.Datetime.to_datetime(date)
+            domain = expression.AND(
+                [
+                    domain,
+                    [
+                        "|",
+                        ("date", "<", date),
+                        "&",
+                        ("date", "=", date),
+                        ("id", "<", message_id),
+                    ],
+                ]
+            )
+        return self.search(domain, order="date desc, id desc", limit=limit)
+
     def set_need_action_done(self):
         """This will mark the messages to be ignored in the tracking issues filter"""
         self.check_access_rule("read")
@@ -261,25 +480,23 @@ class MailMessage(models.Model):
     @api.model
     def get_failed_count(self):
         """Gets the number of failed messages used on discuss mailbox item"""
-        return self.search_count([("is_failed_message", "=", True)])
+        return (
+            self.env["mail.activity.failed.counter"]
+            .sudo()
+            ._get(self.env.user.partner_id)
+        )
 
     @api.model
-    def get_failed_messsage_info(self, ids, model):
-        msg_ids = self.search([("res_id", "=", ids), ("model", "=", model)])
-        res = [
-            msg._prepare_dict_failed_message()
-            for msg in msg_ids.sorted("date", reverse=True)
-            if msg._prepare_dict_failed_message()
-        ]
-        return res
+    def get_failed_messsage_info(self, ids, model, before=None, limit=None):
+        messages = self._failed_messages_search(model, ids, before, limit)
+        return list(filter(None, messages._prepare_dict_failed_messages()))
 
     def _message_notification_format(self):
         """Add info for the web client"""
         formatted_notifications = super()._message_notification_format()
+        messages_by_id = {message.id: message for message in self}
         for notification in formatted_notifications:
-            message = self.filtered(
-                lambda x, notification=notification: x.id == notification["id"]
-            )
+            message = messages_by_id[notification["id"]]
             notification.update(
                 {
                     "mail_tracking_needs_action": message.mail_tracking_needs_action,
@@ -288,12 +505,72 @@ class MailMessage(models.Model):
             )
         return formatted_notifications
 
+    @api.model
+    def _mail_tracking_statuses_fetch(self, message_ids, expand_ids=()):
+        """Tracking statuses of the given messages the user can read, encoded
+        for the web client, which loads them for the displayed messages"""
+        messages = self.search([("id", "in", message_ids)])
+        return self._mail_tracking_statuses_encode(
+            messages.mail_tracking_status_multi(), expand_ids
+        )
+
+    @api.model
+    def _mail_tracking_statuses_encode(self, statuses, expand_ids=()):
+        """Compact the tracking statuses by message id, as big mailings have
+        hundreds of recipients:
+
+        - statuses are codes, indexes of ``codes`` and ``labels``
+        - errors are indexes of ``errors``, a list of [type, description]
+        - recipients are [status, error, tracking, partner, recipient, is cc]
+        - beyond the threshold, recipients are only counted by status code in
+          ``more``, unless their message is in ``expand_ids``
+        """
+        codes = {status: code for code, status in enumerate(STATUS_CODES)}
+        expand_ids = set(expand_ids)
+        errors = {}
+        messages = {}
+        for message_id, partner_trackings in statuses.items():
+            limit = None if message_id in expand_ids else STATUS_COLLAPSE_THRESHOLD
+            recipients = []
+            more = defaultdict(int)
+            for status in partner_trackings:
+                code = codes[status["status"]]
+                if limit is not None and len(recipients) >= limit:
+                    more[code] += 1
+                    continue
+                error = None
+                if status["error_type"] or status["error_description"]:
+                    error = errors.setdefault(
+                        (status["error_type"], status["error_description"]),
+                        len(errors),
+                    )
+                recipients.append(
+                    [
+                        code,
+                        error,
+                        status["tracking_id"],
+                        status["partner_id"],
+                        status["recipient"],
+                        status["isCc"],
+                    ]
+                )
+            messages[message_id] = {"recipients": recipients, "more": dict(more)}
+        return {
+            "codes": list(STATUS_CODES),
+            "labels": [
+                self._partner_tracking_status_human_get(status)
+                for status in STATUS_CODES
+            ],
+            "errors": [list(error) for error in errors],
+            "messages": messages,
+        }
+
     def _message_format_extras(self, format_reply):
-        """Add info for the web client"""
+        """Add info for the web client. Tracking statuses are fetched apart,
+        see `_mail_tracking_statuses_fetch`"""
         res = super()._message_format_extras(format_reply)
         res.update(
             {
-                "partner_trackings": self.mail_tracking_status(),
                 "mail_tracking_needs_action": self.mail_tracking_needs_action,
                 "is_failed_message": self.is_failed_message,
             }
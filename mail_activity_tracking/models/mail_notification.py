@@ -0,0 +1,34 @@
+from odoo import api, models
+
+
+class MailNotification(models.Model):
+    _inherit = "mail.notification"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        notifications = super().create(vals_list)
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        notifications.sudo().mail_message_id._mail_tracking_version_bump()
+        notifications._failed_counter_schedule()
+        return notifications
+
+    def write(self, vals):
+        if "res_partner_id" in vals:
+            self._failed_counter_schedule()
+        res = super().write(vals)
+        if {"res_partner_id", "mail_message_id"}.intersection(vals):
+            self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+            self._failed_counter_schedule()
+        return res
+
+    def unlink(self):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        self.sudo().mail_message_id._mail_tracking_version_bump()
+        self._failed_counter_schedule()
+        return super().unlink()
+
+    def _failed_counter_schedule(self):
+        """The notified partners may see failed messages come and go"""
+        self.env["mail.activity.failed.counter"]._schedule(
+            self.sudo().res_partner_id.ids
+        )
@@ -28,7 +28,7 @@ class MailThread(models.AbstractModel):
         failed_states = self.env["mail.message"].get_failed_states()
         return [
             ("mail_tracking_needs_action", "=", True),
-            ("mail_tracking_ids.state", "in", list(failed_states)),
+            ("mail_tracking_ids", "any", [("state", "in", list(failed_states))]),
         ]
 
     @api.model
@@ -109,20 +109,22 @@ class MailThread(models.AbstractModel):
                 )
 
     @api.model
-    def get_view(self, view_id=None, view_type="form", **options):
+    def _get_view(self, view_id=None, view_type="form", **options):
         """
             Adds filters for failed messages.
 
             These filters will be available in the search views of any model that inherits from ``mail.thread``, allowing users to filter and view messages marked as failed.
 
             This functionality enables better management and visibility of failed messages across various mail-related models.
+
+            The filter is added to the view architecture before it's cached
+            with the rest of the view, so it's only done once per view.
         """
-        res = super().get_view(view_id, view_type, **options)
+        arch, view = super()._get_view(view_id, view_type, **options)
         if view_type != "search":
-            return res
-        doc = etree.XML(res["arch"])
+            return arch, view
         # Modify view to add new filter element
-        nodes = doc.xpath("//search")
+        nodes = arch.xpath("//search")
         if nodes:
             # Create filter element
             new_filter = etree.Element(
@@ -135,7 +137,7 @@ class MailThread(models.AbstractModel):
                             [
                                 "failed_message_ids.mail_tracking_ids.state",
                                 "in",
-                                list(self.env["mail.message"].get_failed_states()),
+                                sorted(self.env["mail.message"].get_failed_states()),
                             ],
                             [
                                 "failed_message_ids.mail_tracking_needs_action",
@@ -148,5 +150,4 @@ class MailThread(models.AbstractModel):
             )
             nodes[0].append(etree.Element("separator"))
             nodes[0].append(new_filter)
-        res["arch"] = etree.tostring(doc, encoding="unicode")
-        return res
+        return arch, view
@@ -2,11 +2,20 @@ from urllib.parse import urljoin
 
 import requests
 
-from odoo import api, fields, models, SUPERUSER_ID, _
+from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import split_every
+from odoo.tools.sql import create_index
 
 from ..wizards.res_config_settings import MAILGUN_TIMEOUT
 
+# Mailgun suppression lists that make an address bounced
+MAILGUN_SUPPRESSION_LISTS = ("bounces", "complaints", "unsubscribes")
+# Max addresses by page of Mailgun suppression lists, and by bulk upload
+MAILGUN_PAGE_LIMIT = 1000
+# Above this number of partners, their bounced check downloads the lists
+MAILGUN_CHECK_LIMIT = 100
+
 
 class ResPartner(models.Model):
     _name = "res.partner"
@@ -19,21 +28,62 @@ class ResPartner(models.Model):
     )
     email_score = fields.Float(compute="_compute_email_score_and_count", readonly=True)
 
+    def init(self):
+        super().init()
+        # Bounced addresses are matched case insensitively
+        create_index(
+            self.env.cr, "res_partner_email_lower_index", self._table, ["lower(email)"]
+        )
+
+    @api.model
+    def _email_partners_get(self, emails):
+        """Active partners by lowercase email, resolved in a single query"""
+        addresses = tuple({email.lower() for email in emails if email})
+        if not addresses:
+            return {}
+        self.flush_model(["email", "active"])
+        self.env.cr.execute(
+            """
+            SELECT lower(email), array_agg(id)
+            FROM res_partner
+            WHERE lower(email) IN %s AND active
+            GROUP BY lower(email)
+            """,
+            (addresses,),
+        )
+        return {email: self.browse(ids) for email, ids in self.env.cr.fetchall()}
+
     @api.depends("email")
     def _compute_email_score_and_count(self):
         self.email_score = 50.0
         self.tracking_emails_count = 0
         partners_mail = self.filtered("email")
-        mt_obj = self.env["mail.activity.tracking"].sudo()
-        for partner in partners_mail:
-            partner.email_score = mt_obj.email_score_from_email(partner.email)
-            # We don't want performance issues due to heavy ACLs check for large
-            # recordsets. Our option is to hide the number for regular users.
-            if not self.env.user.has_group("base.group_system"):
-                continue
-            partner.tracking_emails_count = len(
-                mt_obj._search([("recipient_address", "=", partner.email.lower())])
+        if not partners_mail:
+            return
+        mt_obj = self.env["mail.activity.tracking"]
+        emails = partners_mail.mapped("email")
+        scores = mt_obj.sudo().email_score_from_emails(emails)
+        # ACLs are applied by the query itself, so counting is cheap for
+        # regular users as well
+        counts = dict(
+            mt_obj._read_group(
+                [("recipient_address", "in", list({e.lower() for e in emails}))],
+                ["recipient_address"],
+                ["__count"],
             )
+        )
+        for partner in partners_mail:
+            partner.email_score = scores[partner.email]
+            partner.tracking_emails_count = counts.get(partner.email.lower(), 0)
+
+    def write(self, vals):
+        if {"active", "company_id"}.intersection(vals):
+            self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env["mail.activity.tracking"]._allowed_tracking_cache_clear()
+        return super().unlink()
 
     def email_bounced_set(self, tracking_emails, reason, event=None):
         res = super().email_bounced_set(tracking_emails, reason, event=event)
@@ -41,27 +91,10 @@ class ResPartner(models.Model):
         return res
 
     def _email_bounced_set(self, reason, event):
-        for partner in self:
-            if not partner.email:
-                continue
-            event = event or self.env["mail.activity.event"]
-            event_str = (
-                f'<a href="#" data-oe-model="mail.activity.event"'
-                f'data-oe-id="{event.id or 0}">{event.id or _("unknown")}</a>'
-            )
-            body = _(
-                "Email has been bounced: %(email)s\nReason: "
-                "%(reason)s\nEvent: %(event_str)s",
-                email=partner.email,
-                reason=reason,
-                event_str=event_str,
-            )
-            # This function can be called by the non user via the callback_method set in
-            # /mail/tracking/mailgun/all/. A sudo() is not enough to succesfully send
-            # the bounce message in this circumstances.
-            if self.env.su:
-                partner = partner.with_user(SUPERUSER_ID)
-            partner.message_post(body=body)
+        """Queue the chatter notifications, they're posted as digests"""
+        self.env["mail.activity.bounce"].sudo()._enqueue(
+            self.filtered("email"), reason, event
+        )
 
     def check_email_validity(self):
         """
@@ -150,53 +183,130 @@ class ResPartner(models.Model):
                         % (partner.email)
                     )
 
+    def _mailgun_timeout(self):
+        return (
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("mailgun.timeout", MAILGUN_TIMEOUT)
+        )
+
+    @api.model
+    def _mailgun_suppressed_addresses(self, lists=MAILGUN_SUPPRESSION_LISTS):
+        """Stream the addresses of Mailgun's suppression lists, page by page.
+        API documentation:
+        https://documentation.mailgun.com/en/latest/api-suppressions.html
+        """
+        api_key, api_url, domain, *__ = self.env[
+            "mail.activity.tracking"
+        ]._mailgun_values()
+        timeout = self._mailgun_timeout()
+        for list_name in lists:
+            url = urljoin(api_url, f"/v3/{domain}/{list_name}")
+            params = {"limit": MAILGUN_PAGE_LIMIT}
+            while url:
+                res = requests.get(
+                    url, auth=("api", api_key), params=params, timeout=timeout
+                )
+                res.raise_for_status()
+                page = res.json()
+                items = page.get("items") or []
+                if not items:
+                    break
+                for item in items:
+                    yield item["address"]
+                # The next page URL already has the query parameters
+                url, params = page.get("paging", {}).get("next"), None
+
+    def _mailgun_bounced_reconcile(self, lists=MAILGUN_SUPPRESSION_LISTS):
+        """Sync the bounced flag of the partners (all of them if none given)
+        with Mailgun's suppression lists. Changes are saved in two writes"""
+        suppressed = {
+            address.lower() for address in self._mailgun_suppressed_addresses(lists)
+        }
+        if self:
+            rows = [
+                (partner.id, partner.email.lower(), partner.email_bounced)
+                for partner in self.filtered("email")
+            ]
+        else:
+            self.flush_model(["email", "email_bounced"])
+            self.env.cr.execute(
+                """
+                SELECT id, lower(email), email_bounced
+                FROM res_partner
+                WHERE email IS NOT NULL AND email != ''
+                """
+            )
+            rows = self.env.cr.fetchall()
+        to_set = self.browse(
+            [pid for pid, email, bounced in rows if email in suppressed and not bounced]
+        )
+        to_unset = self.browse(
+            [pid for pid, email, bounced in rows if email not in suppressed and bounced]
+        )
+        to_unset -= to_unset._email_bounced_locally()
+        to_set.write({"email_bounced": True})
+        to_unset._email_bounced_unset()
+        return to_set, to_unset
+
+    @api.model
+    def _cron_mailgun_bounced_reconcile(self):
+        self._mailgun_bounced_reconcile()
+
     def check_email_bounced(self):
         """
         Checks if the partner's email is listed in Mailgun's bounce suppression list.
         API documentation:
         https://documentation.mailgun.com/en/latest/api-suppressions.html
         """
+        partners = self.filtered("email")
+        if len(partners) > MAILGUN_CHECK_LIMIT:
+            # Cheaper to go through the whole list than to ask for every email
+            partners._mailgun_bounced_reconcile(lists=("bounces",))
+            return
         api_key, api_url, domain, *__ = self.env[
             "mail.activity.tracking"
         ]._mailgun_values()
-        timeout = (
-            self.env["ir.config_parameter"]
-            .sudo()
-            .get_param("mailgun.timeout", MAILGUN_TIMEOUT)
-        )
-        for partner in self:
+        timeout = self._mailgun_timeout()
+        to_set = self.browse()
+        to_unset = self.browse()
+        for partner in partners:
             res = requests.get(
                 urljoin(api_url, f"/v3/{domain}/bounces/{partner.email}"),
                 auth=("api", api_key),
                 timeout=timeout,
             )
             if res.status_code == 200 and not partner.email_bounced:
-                partner.email_bounced = True
+                to_set |= partner
             elif res.status_code == 404 and partner.email_bounced:
-                partner.email_bounced = False
+                to_unset |= partner
+        to_unset -= to_unset._email_bounced_locally()
+        to_set.write({"email_bounced": True})
+        to_unset._email_bounced_unset()
 
     def force_set_bounced(self):
         """
-        Forces partner's email into Mailgun's bounces list
+        Forces partners' emails into Mailgun's bounces list, uploading them in
+        bulk.
         API documentation:
         https://documentation.mailgun.com/en/latest/api-suppressions.html
         """
         api_key, api_url, domain, *__ = self.env[
             "mail.activity.tracking"
         ]._mailgun_values()
-        timeout = (
-            self.env["ir.config_parameter"]
-            .sudo()
-            .get_param("mailgun.timeout", MAILGUN_TIMEOUT)
-        )
-        for partner in self:
+        timeout = self._mailgun_timeout()
+        partners = self.filtered("email")
+        for batch in split_every(MAILGUN_PAGE_LIMIT, partners.ids, self.browse):
             res = requests.post(
-                urljoin(api_url, "/v3/{domain}/bounces"),
+                urljoin(api_url, f"/v3/{domain}/bounces"),
                 auth=("api", api_key),
-                data={"address": partner.email},
+                json=[{"address": partner.email} for partner in batch],
                 timeout=timeout,
             )
-            partner.email_bounced = res.status_code == 200 and not partner.email_bounced
+            if res.status_code == 200:
+                batch.filtered(lambda p: not p.email_bounced).write(
+                    {"email_bounced": True}
+                )
 
     def force_unset_bounced(self):
         """
@@ -207,16 +317,34 @@ class ResPartner(models.Model):
         api_key, api_url, domain, *__ = self.env[
             "mail.activity.tracking"
         ]._mailgun_values()
-        timeout = (
-            self.env["ir.config_parameter"]
-            .sudo()
-            .get_param("mailgun.timeout", MAILGUN_TIMEOUT)
-        )
+        timeout = self._mailgun_timeout()
+        to_unset = self.browse()
         for partner in self:
             res = requests.delete(
                 urljoin(api_url, f"/v3/{domain}/bounces/{partner.email}"),
                 auth=("api", api_key),
                 timeout=timeout,
             )
-            if res.status_code in (200, 404) and partner.email_bounced:
-                partner.email_bounced = False
+            if res.status_code in (200, 404):
+                to_unset |= partner
+        to_unset._email_bounced_unset()
+
+    def _email_bounced_locally(self):
+        """Partners whose last tracking bounced. Mailgun doesn't know about
+        these bounces, so its lists don't unflag them"""
+        Tracking = self.env["mail.activity.tracking"].sudo()
+        last_states = Tracking._email_last_tracking_states(self.mapped("email"))
+        bounced_states = Tracking._email_bounced_states()
+        return self.filtered(
+            lambda partner: partner.email
+            and last_states.get(partner.email.lower(), {}).get("state")
+            in bounced_states
+        )
+
+    def _email_bounced_unset(self):
+        """Unflag the partners and send emails to their addresses again, even
+        if their last tracking was a bounce"""
+        self.filtered("email_bounced").write({"email_bounced": False})
+        self.env["mail.activity.reputation"].sudo()._last_state_reset(
+            self.mapped("email")
+        )
@@ -26,6 +26,9 @@ export class FailedMessage extends Component {
         this.state = useState({showDetails: false});
         this.message = useState(this.props.message);
         this.orm = useService("orm");
+        useService("mail_activity_tracking.status").load(this.message, {
+            expand: true,
+        });
     }
     async setFailedMessageReviewed() {
         await this.orm.call("mail.message", "set_need_action_done", [
@@ -101,8 +104,15 @@ export class FailedMessage extends Component {
         );
     }
     get failed_recipients() {
-        const error_states = ["error", "rejected", "spam", "bounced", "soft-bounced"];
-        return this.message.partner_trackings.filter((message) => {
+        const error_states = [
+            "error",
+            "rejected",
+            "spam",
+            "bounced",
+            "soft-bounced",
+            "suppressed",
+        ];
+        return (this.message.partner_trackings || []).filter((message) => {
             return error_states.includes(message.status);
         });
     }
@@ -46,8 +46,15 @@ export class FailedMessageReview extends Component {
         );
     }
     get failed_recipients() {
-        const error_states = ["error", "rejected", "spam", "bounced", "soft-bounced"];
-        return this.message.partner_trackings.filter((message) => {
+        const error_states = [
+            "error",
+            "rejected",
+            "spam",
+            "bounced",
+            "soft-bounced",
+            "suppressed",
+        ];
+        return (this.message.partner_trackings || []).filter((message) => {
             return error_states.includes(message.status);
         });
     }
@@ -2,6 +2,7 @@
 import {ActionPanel} from "@mail/discuss/core/common/action_panel";
 import {MessageCardList} from "@mail/core/common/message_card_list";
 import {_t} from "@web/core/l10n/translation";
+import {serializeDateTime} from "@web/core/l10n/dates";
 import {useFailedMessageSearch} from "@mail_activity_tracking/core/search/failed_message_search_hook.esm";
 
 const {Component, onWillUpdateProps, useState} = owl;
@@ -40,9 +41,9 @@ export class FailedMessagesPanel extends Component {
         this.messageSearch.clear();
     }
     onLoadMoreVisible() {
-        const before = this.messageSearch.messages
-            ? Math.min(...this.messageSearch.messages.map((message) => message.id))
-            : false;
+        // Pages follow the last loaded message, in date order
+        const last = this.messageSearch.messages.at(-1);
+        const before = last ? [serializeDateTime(last.date), last.id] : false;
         this.messageSearch.search(before);
     }
 }
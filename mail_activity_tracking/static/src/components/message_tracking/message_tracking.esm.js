@@ -1,13 +1,9 @@
 /** @odoo-module **/
-const {Component, useState} = owl;
+const {Component} = owl;
 
 export class MessageTracking extends Component {
     static template = "mail_activity_tracking.MessageTracking";
     static props = ["message", "partner_trackings", "skip_track_links?"];
-    setup() {
-        this.message = useState(this.props.message);
-        this.partner_trackings = useState(this.props.partner_trackings);
-    }
     _onTrackingStatusClick(event) {
         var tracking_email_id = $(event.currentTarget).data("tracking");
         event.preventDefault();
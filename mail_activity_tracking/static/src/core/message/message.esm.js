@@ -3,6 +3,9 @@ import {FailedMessageReview} from "@mail_activity_tracking/components/failed_mes
 import {Message} from "@mail/core/common/message";
 import {MessageTracking} from "@mail_activity_tracking/components/message_tracking/message_tracking.esm";
 import {patch} from "@web/core/utils/patch";
+import {useService} from "@web/core/utils/hooks";
+
+const {onMounted, onWillUnmount} = owl;
 
 Message.props.push("isFailedMessage?");
 
@@ -13,9 +16,49 @@ Message.components = {
 };
 
 patch(Message.prototype, {
+    setup() {
+        super.setup(...arguments);
+        this.trackingStatus = useService("mail_activity_tracking.status");
+        // Tracking statuses are only loaded once the message is shown
+        let observer = null;
+        onMounted(() => {
+            if (!this.root.el) {
+                return;
+            }
+            observer = new IntersectionObserver((entries) => {
+                if (entries.some((entry) => entry.isIntersecting)) {
+                    this.trackingStatus.load(this.props.message, {
+                        expand: this.isFailedReview,
+                    });
+                    observer.disconnect();
+                }
+            });
+            observer.observe(this.root.el);
+        });
+        onWillUnmount(() => observer?.disconnect());
+    },
+    /**
+     * Failed recipients are reviewed from all of them
+     */
+    get isFailedReview() {
+        return (
+            (this.env.inDiscussApp && this.props.thread?.id === "failed") ||
+            Boolean(this.props.messageSearch)
+        );
+    },
+    onClickMoreTrackings() {
+        this.trackingStatus.load(this.props.message, {expand: true});
+    },
     get failed_recipients() {
-        const error_states = ["error", "rejected", "spam", "bounced", "soft-bounced"];
-        return this.message.partner_trackings.filter((message) => {
+        const error_states = [
+            "error",
+            "rejected",
+            "spam",
+            "bounced",
+            "soft-bounced",
+            "suppressed",
+        ];
+        return (this.message.partner_trackings || []).filter((message) => {
             return error_states.includes(message.status);
         });
     },
@@ -19,6 +19,25 @@ export function useFailedMessageSearch(thread) {
             this.loadMore = loadMore;
             this.messages = messages;
         },
+        /**
+         * Load the next page of failed messages
+         *
+         * @param {Array} [before] [date, id] of the last loaded message
+         */
+        async search(before = false) {
+            if (!before) {
+                return this.filter_failed();
+            }
+            this.searching = true;
+            const res = await sequential(() =>
+                threadService.filter_failed(this.thread, before)
+            );
+            this.searching = false;
+            if (res) {
+                this.loadMore = res.loadMore;
+                this.messages = [...this.messages, ...res.messages];
+            }
+        },
         count: 0,
         clear() {
             this.messages = [];
@@ -0,0 +1,21 @@
+/** @odoo-module */
+import {registry} from "@web/core/registry";
+
+/**
+ * Keeps the counter of the failed messages mailbox up to date with the
+ * changes pushed by the server.
+ */
+export const failedCounterService = {
+    dependencies: ["bus_service", "mail.store"],
+    start(env, {bus_service, "mail.store": store}) {
+        bus_service.subscribe("mail_activity_tracking/failed_counter", ({counter}) => {
+            if (store.discuss.failed) {
+                store.discuss.failed.counter = counter;
+            }
+        });
+    },
+};
+
+registry
+    .category("services")
+    .add("mail_activity_tracking.failed_counter", failedCounterService);
@@ -9,16 +9,18 @@ const FETCH_LIMIT = 30;
 /** @type {import("@mail/core/common/thread_service").ThreadService} */
 const ThreadServicePatch = {
     /**
+     * Failed messages of the thread, newest first, by page
+     *
      * @param {Thread} thread
+     * @param {Array} [before] [date, id] of the last message of the previous page
      */
-    async filter_failed(thread) {
-        var {messages, count} = await this.rpc(this.getFetchRoute(thread), {
-            ...this.getFetchParams(thread),
+    async filter_failed(thread, before = false) {
+        const {messages, count} = await this.rpc("/mail/thread/failed_messages", {
+            thread_model: thread.model,
+            thread_id: thread.id,
+            before,
+            limit: FETCH_LIMIT,
         });
-        messages = messages.filter((message) => {
-            return message.is_failed_message;
-        });
-        count = messages?.length;
         return {
             count,
             loadMore: messages.length === FETCH_LIMIT,
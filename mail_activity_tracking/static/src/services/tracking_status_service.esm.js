@@ -0,0 +1,91 @@
+/** @odoo-module */
+import {registry} from "@web/core/registry";
+
+/**
+ * Loads the tracking statuses of the displayed messages. The requests of the
+ * messages shown at the same time are grouped in a single call.
+ */
+export class TrackingStatusService {
+    constructor(env, services) {
+        this.rpc = services.rpc;
+        /** @type {Map<Number, {message: import("@mail/core/common/message_model").Message, expand: Boolean}>} */
+        this.pending = new Map();
+        this.scheduled = false;
+    }
+    /**
+     * @param {import("@mail/core/common/message_model").Message} message
+     * @param {Object} [options]
+     * @param {Boolean} [options.force] reload already loaded statuses
+     * @param {Boolean} [options.expand] load all the recipients
+     */
+    load(message, {force = false, expand = false} = {}) {
+        if (!message?.id) {
+            return;
+        }
+        const collapsed = expand && message.partner_trackings_more;
+        if (message.partner_trackings && !force && !collapsed) {
+            return;
+        }
+        // Reloaded statuses stay expanded when all of them were shown
+        if (force && message.partner_trackings && !message.partner_trackings_more) {
+            expand = true;
+        }
+        expand = expand || Boolean(this.pending.get(message.id)?.expand);
+        this.pending.set(message.id, {message, expand});
+        if (!this.scheduled) {
+            this.scheduled = true;
+            Promise.resolve().then(() => this.flush());
+        }
+    }
+    async flush() {
+        const messages = this.pending;
+        this.pending = new Map();
+        this.scheduled = false;
+        if (!messages.size) {
+            return;
+        }
+        const payload = await this.rpc("/mail/tracking/statuses", {
+            message_ids: [...messages.keys()],
+            expand_ids: [...messages.keys()].filter((id) => messages.get(id).expand),
+        });
+        for (const [id, {message}] of messages) {
+            Object.assign(message, this.decode(payload, id));
+        }
+    }
+    /**
+     * @param {Object} payload compact statuses, see `_mail_tracking_statuses_encode`
+     * @param {Number} id message id
+     * @returns {Object} the recipients statuses and the number of the others
+     */
+    decode(payload, id) {
+        const {codes, labels, errors} = payload;
+        const {recipients = [], more = {}} = payload.messages[id] || {};
+        return {
+            partner_trackings: recipients.map(
+                ([code, error, tracking_id, partner_id, recipient, isCc], index) => ({
+                    status: codes[code],
+                    status_human: labels[code],
+                    error_type: error === null ? false : errors[error][0],
+                    error_description: error === null ? false : errors[error][1],
+                    tracking_id,
+                    partner_id,
+                    recipient,
+                    isCc,
+                    tracking_delta: `${id}-${index}`,
+                })
+            ),
+            partner_trackings_more: Object.values(more).reduce((a, b) => a + b, 0),
+        };
+    }
+}
+
+export const trackingStatusService = {
+    dependencies: ["rpc"],
+    start(env, services) {
+        return new TrackingStatusService(env, services);
+    },
+};
+
+registry
+    .category("services")
+    .add("mail_activity_tracking.status", trackingStatusService);
@@ -0,0 +1,30 @@
+/** @odoo-module */
+import {registry} from "@web/core/registry";
+
+/**
+ * Reloads the tracking statuses of the shown messages whose trackings
+ * changed, as pushed by the server.
+ */
+export const trackingUpdateService = {
+    dependencies: ["bus_service", "mail.store", "mail_activity_tracking.status"],
+    start(env, services) {
+        const store = services["mail.store"];
+        const status = services["mail_activity_tracking.status"];
+        services.bus_service.subscribe(
+            "mail_activity_tracking/statuses",
+            ({message_ids}) => {
+                for (const id of message_ids) {
+                    const message = store.Message.get({id});
+                    // Only the already loaded statuses are shown
+                    if (message?.partner_trackings) {
+                        status.load(message, {force: true});
+                    }
+                }
+            }
+        );
+    },
+};
+
+registry
+    .category("services")
+    .add("mail_activity_tracking.tracking_update", trackingUpdateService);
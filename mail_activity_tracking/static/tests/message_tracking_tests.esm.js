@@ -0,0 +1,110 @@
+/* @odoo-module */
+
+import {click, contains} from "@web/../tests/utils";
+import {patchWithCleanup} from "@web/../tests/helpers/utils";
+import {start} from "@mail/../tests/helpers/test_utils";
+import {startServer} from "@bus/../tests/helpers/mock_python_environment";
+
+QUnit.module("mail_activity_tracking", {
+    beforeEach() {
+        // Messages are always shown in the tests
+        patchWithCleanup(window, {
+            IntersectionObserver: class {
+                constructor(callback) {
+                    this.callback = callback;
+                }
+                observe() {
+                    this.callback([{isIntersecting: true}]);
+                }
+                disconnect() {}
+            },
+        });
+    },
+});
+
+/**
+ * @param {Number} messageId
+ * @param {Array[]} recipients compact recipients, see `_mail_tracking_statuses_encode`
+ * @param {Object} [more] number of the other recipients by status code
+ */
+function statusesPayload(messageId, recipients, more = {}) {
+    return {
+        codes: ["unknown", "waiting", "error", "sent", "delivered", "opened"],
+        labels: ["Unknown", "Waiting", "Error", "Sent", "Delivered", "Opened"],
+        errors: [],
+        messages: {[messageId]: {recipients, more}},
+    };
+}
+
+QUnit.test("Expanding the collapsed recipients shows them", async (assert) => {
+    const pyEnv = await startServer();
+    const partnerId = pyEnv["res.partner"].create({name: "Recipient"});
+    const messageId = pyEnv["mail.message"].create({
+        body: "not empty",
+        model: "res.partner",
+        res_id: partnerId,
+    });
+    const expandIds = [];
+    let code = 3;
+    const {openFormView} = await start({
+        async mockRPC(route, args) {
+            if (route === "/mail/tracking/statuses") {
+                expandIds.push(args.expand_ids);
+                const recipients = [
+                    [code, null, 1, partnerId, "First recipient", false],
+                ];
+                if (!args.expand_ids.includes(messageId)) {
+                    return statusesPayload(messageId, recipients, {3: 1});
+                }
+                recipients.push([5, null, 2, false, "second@example.com", false]);
+                return statusesPayload(messageId, recipients);
+            }
+        },
+    });
+    await openFormView("res.partner", partnerId);
+    await contains(".o_mail_tracking .mail_tracking", {count: 1});
+    await click(".o_mail_tracking_more");
+    await contains(".o_mail_tracking .mail_tracking", {count: 2});
+    await contains(".o_mail_tracking span", {text: "second@example.com"});
+    await contains(".o_mail_tracking_more", {count: 0});
+    // Pushed changes keep the recipients expanded
+    code = 5;
+    pyEnv["bus.bus"]._sendone(
+        pyEnv.currentPartner,
+        "mail_activity_tracking/statuses",
+        {message_ids: [messageId]}
+    );
+    await contains(".o_mail_tracking .mail_tracking_sent", {count: 0});
+    await contains(".o_mail_tracking .mail_tracking", {count: 2});
+    assert.deepEqual(expandIds, [[], [messageId], [messageId]]);
+});
+
+QUnit.test("Pushed tracking changes update the shown statuses", async () => {
+    const pyEnv = await startServer();
+    const partnerId = pyEnv["res.partner"].create({name: "Recipient"});
+    const messageId = pyEnv["mail.message"].create({
+        body: "not empty",
+        model: "res.partner",
+        res_id: partnerId,
+    });
+    let code = 3;
+    const {openFormView} = await start({
+        async mockRPC(route) {
+            if (route === "/mail/tracking/statuses") {
+                return statusesPayload(messageId, [
+                    [code, null, 1, partnerId, "Recipient", false],
+                ]);
+            }
+        },
+    });
+    await openFormView("res.partner", partnerId);
+    await contains(".o_mail_tracking .mail_tracking_sent");
+    code = 5;
+    pyEnv["bus.bus"]._sendone(
+        pyEnv.currentPartner,
+        "mail_activity_tracking/statuses",
+        {message_ids: [messageId]}
+    );
+    await contains(".o_mail_tracking .text-success");
+    await contains(".o_mail_tracking .mail_tracking_sent", {count: 0});
+});
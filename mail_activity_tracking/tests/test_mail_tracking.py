@@ -1,15 +1,18 @@
 import base64
 import time
+from datetime import timedelta
 from unittest.mock import patch
 
 from werkzeug.exceptions import BadRequest
 
 from odoo import http
+from odoo.exceptions import AccessError
 from odoo.fields import Command
 from odoo.tests.common import TransactionCase
 from odoo.tools import mute_logger
 
 from odoo.addons.mail_activity_tracking.controllers.main import BLANK, MailTrackingController
+from odoo.addons.mail_activity_tracking.models.mail_alias import ALIASES_VERSION_KEY
 
 mock_send_email = "odoo.addons.base.models.ir_mail_server." "IrMailServer.send_email"
 
@@ -107,7 +110,7 @@ class TestMailTracking(TransactionCase):
         # First partner is recipient
         partner_id = message_dict["history_partner_ids"][0]
         self.assertEqual(partner_id, self.recipient.id)
-        status = message_dict["partner_trackings"][0]
+        status = message.mail_tracking_status()[0]
         # Tracking status must be sent and
         # mail tracking must be the one search before
         self.assertEqual(status["status"], "sent")
@@ -125,6 +128,137 @@ class TestMailTracking(TransactionCase):
         tracking_email.event_create("open", metadata)
         self.assertEqual(tracking_email.state, "opened")
 
+    def test_mail_tracking_status_partner_access(self):
+        other_company = self.env["res.company"].create({"name": "Other company"})
+        self.env["res.partner"].create(
+            {
+                "name": "Other company partner",
+                "email": "other@example.com",
+                "company_id": other_company.id,
+            }
+        )
+        user = self.env["res.users"].create(
+            {
+                "name": "Tracking user",
+                "login": "tracking-user",
+                "groups_id": [Command.set(self.env.ref("base.group_user").ids)],
+            }
+        )
+        message = self.env["mail.message"].create(
+            {
+                "body": "<p>Recipients</p>",
+                "author_id": user.partner_id.id,
+                "email_to": "other@example.com",
+            }
+        )
+        status = message.mail_tracking_status()[0]
+        self.assertEqual(status["recipient"], "Other company partner")
+        # Partners of other companies aren't shown to the user
+        status = message.with_user(user).mail_tracking_status()[0]
+        self.assertEqual(status["recipient"], "other@example.com")
+        self.assertFalse(status["partner_id"])
+        payload = message.with_user(user)._mail_tracking_statuses_fetch(message.ids)
+        recipient = payload["messages"][message.id]["recipients"][0]
+        self.assertEqual(recipient[4], "other@example.com")
+
+    def test_mail_tracking_status_multi(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        other_mail, other_tracking = self.mail_send(self.sender.email)
+        tracking.event_create("open", {})
+        messages = mail.mail_message_id | other_mail.mail_message_id
+        statuses = messages.mail_tracking_status_multi()
+        for message in messages:
+            self.assertEqual(statuses[message.id], message.mail_tracking_status())
+        self.assertEqual(statuses[mail.mail_message_id.id][0]["status"], "opened")
+        payload = messages._mail_tracking_statuses_fetch(messages.ids + [0])
+        self.assertEqual(set(payload["messages"]), set(messages.ids))
+        # Statuses are loaded on demand by the web client
+        for vals in messages.message_format():
+            self.assertNotIn("partner_trackings", vals)
+
+    def test_mail_tracking_statuses_encode(self):
+        statuses = {
+            1: [
+                {
+                    "status": "error",
+                    "error_type": "no_recipient",
+                    "error_description": "No email",
+                    "tracking_id": 10 + i,
+                    "partner_id": i,
+                    "recipient": f"Partner {i}",
+                    "isCc": False,
+                }
+                for i in range(25)
+            ]
+        }
+        Message = self.env["mail.message"]
+        payload = Message._mail_tracking_statuses_encode(statuses)
+        code = payload["codes"].index("error")
+        self.assertEqual(payload["errors"], [["no_recipient", "No email"]])
+        recipients = payload["messages"][1]["recipients"]
+        self.assertEqual(recipients[0], [code, 0, 10, 0, "Partner 0", False])
+        # Recipients beyond the threshold are only counted
+        self.assertEqual(len(recipients), 20)
+        self.assertEqual(payload["messages"][1]["more"], {code: 5})
+        payload = Message._mail_tracking_statuses_encode(statuses, expand_ids=[1])
+        self.assertEqual(len(payload["messages"][1]["recipients"]), 25)
+        self.assertFalse(payload["messages"][1]["more"])
+
+    def test_tracking_update_notify(self):
+        Update = self.env["mail.activity.tracking.update"]
+        admin = self.env.ref("base.partner_admin")
+        mail, tracking = self.mail_send(self.recipient.email)
+        message = mail.mail_message_id
+        message.author_id = admin
+        Update.search([]).unlink()
+        tracking.event_create("open", {})
+        tracking.event_create("delivered", {})
+        # Changes of the same message are pushed once per window
+        self.assertEqual(Update.search([]).mail_message_id, message)
+        # A non empty queue still schedules the next run
+        cron = self.env.ref(
+            "mail_activity_tracking.ir_cron_mail_activity_tracking_update"
+        )
+        self.env["ir.cron.trigger"].search([("cron_id", "=", cron.id)]).unlink()
+        self.env.cr.precommit.clear()
+        Update._enqueue(message.ids)
+        self.assertTrue(
+            self.env["ir.cron.trigger"].search([("cron_id", "=", cron.id)])
+        )
+        Update._cron_notify()
+        self.assertFalse(Update.search([]))
+        notifications = self.env["bus.bus"].search(
+            [("channel", "like", f'"res.partner", {admin.id}]')]
+        )
+        self.assertTrue(
+            any(
+                "mail_activity_tracking/statuses" in notification.message
+                and str(message.id) in notification.message
+                for notification in notifications
+            )
+        )
+
+    def test_mail_tracking_status_cache(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        message = mail.mail_message_id
+        version = message.mail_tracking_version
+        self.assertEqual(message.mail_tracking_status()[0]["status"], "sent")
+        # Cached statuses are copies, callers can't alter them
+        message.mail_tracking_status()[0]["status"] = "altered"
+        self.assertEqual(message.mail_tracking_status()[0]["status"], "sent")
+        tracking.event_create("open", {})
+        self.assertNotEqual(message.mail_tracking_version, version)
+        self.assertEqual(message.mail_tracking_status()[0]["status"], "opened")
+        version = message.mail_tracking_version
+        message.write({"email_cc": "cc@example.com"})
+        self.assertNotEqual(message.mail_tracking_version, version)
+        self.assertTrue(
+            any(
+                status["recipient"] == "cc@example.com"
+                for status in message.mail_tracking_status()
+            )
+        )
+
     def test_message_post_partner_no_email(self):
         # Create message with recipient without defined email
         self.recipient.write({"email": False})
@@ -157,12 +291,12 @@ class TestMailTracking(TransactionCase):
         self.assertFalse(self.recipient.email_bounced)
 
     def _check_partner_trackings_cc(self, message):
-        message_dict = message.message_format()[0]
-        self.assertEqual(len(message_dict["partner_trackings"]), 3)
+        partner_trackings = message.mail_tracking_status()
+        self.assertEqual(len(partner_trackings), 3)
         # mail cc
         foundPartner = False
         foundNoPartner = False
-        for tracking in message_dict["partner_trackings"]:
+        for tracking in partner_trackings:
             if tracking["partner_id"] == self.sender.id:
                 foundPartner = True
                 self.assertTrue(tracking["isCc"])
@@ -215,12 +349,12 @@ class TestMailTracking(TransactionCase):
         self._check_partner_trackings_cc(message)
 
     def _check_partner_trackings_to(self, message):
-        message_dict = message.message_format()[0]
-        self.assertEqual(len(message_dict["partner_trackings"]), 4)
+        partner_trackings = message.mail_tracking_status()
+        self.assertEqual(len(partner_trackings), 4)
         # mail cc
         foundPartner = False
         foundNoPartner = False
-        for tracking in message_dict["partner_trackings"]:
+        for tracking in partner_trackings:
             if tracking["partner_id"] == self.sender.id:
                 foundPartner = True
             elif tracking["recipient"] == "support+unnamed@test.com":
@@ -284,6 +418,29 @@ class TestMailTracking(TransactionCase):
         suggested_mails = {email[1] for email in recipients[self.recipient.id]}
         self.assertNotIn("support+unnamed@test.com", suggested_mails)
 
+    def test_aliases_cache(self):
+        MailAlias = self.env["mail.alias"]
+        aliases = MailAlias.get_aliases()
+        self.assertIsInstance(aliases, frozenset)
+        # Unchanged aliases are kept by the worker
+        self.env.cr.cache.pop(ALIASES_VERSION_KEY, None)
+        self.assertIs(MailAlias.get_aliases(), MailAlias.get_aliases())
+        alias_domain = self.env["mail.alias.domain"].create(
+            {"catchall_alias": "catchall", "name": "alias.example.com"}
+        )
+        # Changes are seen at once by the transaction
+        self.assertIn("catchall@alias.example.com", MailAlias.get_aliases())
+        alias_domain.unlink()
+        self.assertNotIn("catchall@alias.example.com", MailAlias.get_aliases())
+
+    def test_search_view_failed_filter(self):
+        arch = self.env["res.partner"].get_view(view_type="search")["arch"]
+        self.assertEqual(arch.count('name="failed_message_ids"'), 1)
+        # The filter comes with the cached view
+        self.assertEqual(
+            self.env["res.partner"].get_view(view_type="search")["arch"], arch
+        )
+
     def test_failed_message(self):
         MailMessageObj = self.env["mail.message"]
         # Create message
@@ -292,6 +449,8 @@ class TestMailTracking(TransactionCase):
         # Force error state
         tracking.state = "error"
         self.assertTrue(tracking.mail_message_id.mail_tracking_needs_action)
+        # Counters are refreshed before committing
+        self.env.cr.precommit.run()
         failed_count = MailMessageObj.get_failed_count()
         self.assertTrue(failed_count > 0)
         values = tracking.mail_message_id.get_failed_messages()
@@ -301,15 +460,114 @@ class TestMailTracking(TransactionCase):
         self.assertTrue(messages)
         self.assertTrue(messages_failed)
         self.assertTrue(len(messages) > len(messages_failed))
+        # Negated searches return the other messages
+        messages_not_failed = MailMessageObj.search([["is_failed_message", "=", False]])
+        self.assertEqual(messages_failed | messages_not_failed, messages)
+        self.assertFalse(messages_failed & messages_not_failed)
+        self.assertEqual(
+            MailMessageObj.search([["is_failed_message", "!=", False]]),
+            messages_failed,
+        )
         tracking.mail_message_id.set_need_action_done()
         self.assertFalse(tracking.mail_message_id.mail_tracking_needs_action)
+        self.env.cr.precommit.run()
         self.assertTrue(MailMessageObj.get_failed_count() < failed_count)
+        self.assertEqual(
+            MailMessageObj.get_failed_count(),
+            MailMessageObj.search_count([("is_failed_message", "=", True)]),
+        )
+        # Changes are pushed to the partner
+        notifications = self.env["bus.bus"].search(
+            [("channel", "like", f'"res.partner", {self.env.user.partner_id.id}]')]
+        )
+        self.assertTrue(
+            any(
+                "mail_activity_tracking/failed_counter" in notification.message
+                for notification in notifications
+            )
+        )
         # No author_id
         tracking.mail_message_id.author_id = False
         values = tracking.mail_message_id.get_failed_messages()[0]
         if values and values.get("author"):
             self.assertEqual(values["author"][0], -1)
 
+    def test_failed_messages_pages(self):
+        MailMessageObj = self.env["mail.message"]
+        messages = MailMessageObj.create(
+            [
+                {
+                    "model": "res.partner",
+                    "res_id": self.recipient.id,
+                    "message_type": "comment",
+                    "body": "<p>This is a test message</p>",
+                    "author_id": self.env.user.partner_id.id,
+                }
+                for _i in range(3)
+            ]
+        )
+        self.env["mail.activity.tracking"].create(
+            [
+                {
+                    "mail_message_id": message.id,
+                    "partner_id": self.recipient.id,
+                    "state": "error",
+                }
+                for message in messages
+            ]
+        )
+        # Messages sharing their date are sorted by id
+        messages.write({"date": messages[0].date})
+        info = MailMessageObj.get_failed_messsage_info(
+            self.recipient.id, "res.partner", limit=2
+        )
+        self.assertEqual([vals["id"] for vals in info], messages[::-1][:2].ids)
+        self.assertEqual(info[0]["failed_recipients"][0]["id"], self.recipient.id)
+        before = (info[-1]["date"], info[-1]["id"])
+        info = MailMessageObj.get_failed_messsage_info(
+            self.recipient.id, "res.partner", before=before, limit=2
+        )
+        self.assertEqual([vals["id"] for vals in info], messages[0].ids)
+        messages[0].set_need_action_done()
+        self.assertEqual(
+            MailMessageObj._failed_messages_search("res.partner", self.recipient.id),
+            messages[1:].sorted("id", reverse=True),
+        )
+        # Pages go on when the last message shown was deleted, in date order
+        before = (messages[2].date, messages[2].id)
+        messages[1].date -= timedelta(days=1)
+        messages[2].unlink()
+        self.assertEqual(
+            MailMessageObj._failed_messages_search(
+                "res.partner", self.recipient.id, before=before
+            ),
+            messages[1],
+        )
+        # Only the failed messages of the current user are shown
+        messages[1].author_id = self.sender
+        self.assertFalse(
+            MailMessageObj._failed_messages_search("res.partner", self.recipient.id)
+        )
+
+    def test_message_notification_format_failed(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        other_mail, other_tracking = self.mail_send(self.sender.email)
+        messages = mail.mail_message_id | other_mail.mail_message_id
+        messages.author_id = self.env.user.partner_id
+        tracking.state = "error"
+        messages.invalidate_recordset(["is_failed_message"])
+        formatted = {
+            vals["id"]: vals for vals in messages._message_notification_format()
+        }
+        self.assertTrue(formatted[mail.mail_message_id.id]["is_failed_message"])
+        self.assertFalse(formatted[other_mail.mail_message_id.id]["is_failed_message"])
+        self.assertEqual(
+            messages.filtered("is_failed_message"),
+            messages.search(
+                [("id", "in", messages.ids), ("is_failed_message", "=", True)]
+            ),
+        )
+
     def test_resend_failed_message(self):
         # This message will generate a notification for recipient
         message = self.env["mail.message"].create(
@@ -407,15 +665,14 @@ class TestMailTracking(TransactionCase):
             controller.mail_tracking_open(db, tracking.id)
             self.assertEqual(1, len(tracking.tracking_event_ids))
             tracking.write({"state": "opened"})
-            # Tracking isn't in sent or delivered state.
-            # Don't generates tracking event
+            # Repeated opens are tracked whatever the tracking state is
             controller.mail_tracking_open(db, tracking.id, tracking.token)
-            self.assertEqual(1, len(tracking.tracking_event_ids))
-            tracking.write({"state": "sent"})
-            # Tracking is in sent or delivered state and a token is given.
-            # Generates tracking event
+            self.assertEqual(2, len(tracking.tracking_event_ids))
+            self.assertEqual(1, tracking.open_count)
+            # Concurrent opens are discarded
             controller.mail_tracking_open(db, tracking.id, tracking.token)
             self.assertEqual(2, len(tracking.tracking_event_ids))
+            self.assertEqual(1, tracking.open_count)
             # Generate new email due concurrent event filter
             mail, tracking = self.mail_send(self.recipient.email)
             tracking.write({"token": False})
@@ -479,6 +736,33 @@ class TestMailTracking(TransactionCase):
         opens = tracking.tracking_event_ids.filtered(lambda r: r.event_type == "open")
         self.assertEqual(len(opens), 2)
 
+    def test_event_client_interned(self):
+        metadata = {
+            "ip": "127.0.0.1",
+            "user_agent": "Odoo Test/1.0",
+            "os_family": "linux",
+            "ua_family": "odoo",
+        }
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("open", metadata)
+        mail, other_tracking = self.mail_send(self.recipient.email)
+        other_tracking.event_create("open", metadata)
+        open_event = tracking.tracking_event_ids.filtered(
+            lambda r: r.event_type == "open"
+        )
+        other_open_event = other_tracking.tracking_event_ids.filtered(
+            lambda r: r.event_type == "open"
+        )
+        self.assertTrue(open_event.client_id)
+        self.assertEqual(open_event.client_id, other_open_event.client_id)
+        self.assertEqual(open_event.user_agent, "Odoo Test/1.0")
+        self.assertEqual(open_event.os_family, "linux")
+        # Sent events have no client info at all
+        sent_event = tracking.tracking_event_ids.filtered(
+            lambda r: r.event_type == "sent"
+        )
+        self.assertFalse(sent_event.client_id)
+
     def test_concurrent_click(self):
         mail, tracking = self.mail_send(self.recipient.email)
         ts = time.time()
@@ -511,6 +795,38 @@ class TestMailTracking(TransactionCase):
         opens = tracking.tracking_event_ids.filtered(lambda r: r.event_type == "click")
         self.assertEqual(len(opens), 3)
 
+    def test_engagement_counters(self):
+        self.env["ir.config_parameter"].set_param(
+            "mail_activity_tracking.event_store_limit", 2
+        )
+        mail, tracking = self.mail_send(self.recipient.email)
+        ts = time.time()
+        for delta in (0, 100, 200):
+            tracking.event_create("open", {"timestamp": ts + delta})
+        # Concurrent open, discarded even when events aren't stored anymore
+        tracking.event_create("open", {"timestamp": ts + 202})
+        clicks = (
+            (300, "https://a.example.com"),
+            (400, "https://b.example.com"),
+            (500, "https://a.example.com"),
+        )
+        for delta, url in clicks:
+            tracking.event_create("click", {"timestamp": ts + delta, "url": url})
+        engagement_events = tracking.tracking_event_ids.filtered(
+            lambda r: r.event_type in ("open", "click")
+        )
+        self.assertEqual(len(engagement_events), 2)
+        self.assertEqual(tracking.open_count, 3)
+        self.assertEqual(tracking.click_count, 3)
+        self.assertEqual(tracking.unique_click_urls, 2)
+        self.assertEqual(len(tracking.tracking_url_ids), 2)
+        self.assertTrue(tracking.first_open < tracking.last_open)
+        # Opens don't hide an unsubscription
+        tracking.event_create("unsub", {})
+        tracking.event_create("open", {"timestamp": ts + 600})
+        self.assertEqual(tracking.state, "unsub")
+        self.assertEqual(tracking.open_count, 4)
+
     @mute_logger("odoo.addons.mail.models.mail_mail")
     def test_smtp_error(self):
         with patch(mock_send_email) as mock_func:
@@ -594,6 +910,69 @@ class TestMailTracking(TransactionCase):
             self.assertEqual("bounced", tracking.state)
         self.assertEqual(0.0, self.recipient.email_score)
 
+    def test_bounce_partners_case_insensitive(self):
+        duplicate = self.env["res.partner"].create(
+            {"name": "Test duplicate", "email": self.recipient.email.upper()}
+        )
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("hard_bounce", {})
+        self.assertTrue(self.recipient.email_bounced)
+        self.assertTrue(duplicate.email_bounced)
+        self.assertFalse(self.sender.email_bounced)
+
+    def test_suppressed_recipient(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("hard_bounce", {})
+        Reputation = self.env["mail.activity.reputation"]
+        Reputation._suppression_filter_refresh(Reputation._suppression_filter())
+        with patch(mock_send_email) as mock_func:
+            mail, tracking = self.mail_send(self.recipient.email)
+            mock_func.assert_not_called()
+        self.assertEqual(tracking.state, "suppressed")
+        # Failed instead of recorded as sent
+        self.assertEqual(mail.state, "exception")
+        self.assertEqual(mail.failure_reason, tracking.error_description)
+        self.assertTrue(mail.mail_message_id.mail_tracking_needs_action)
+        # Still suppressed after the suppressed email
+        self.assertEqual(
+            Reputation._suppressed_addresses([self.recipient.email]),
+            {self.recipient.email},
+        )
+        Reputation._rebuild([self.recipient.email])
+        self.assertEqual(
+            Reputation._suppressed_addresses([self.recipient.email]),
+            {self.recipient.email},
+        )
+        self.env["ir.config_parameter"].set_param(
+            "mail_activity_tracking.suppression_disabled", True
+        )
+        with patch(mock_send_email) as mock_func:
+            mail, tracking = self.mail_send(self.recipient.email)
+            mock_func.assert_called_once()
+
+    def test_suppressed_recipient_unset(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("hard_bounce", {})
+        self.assertTrue(self.recipient.email_bounced)
+        Reputation = self.env["mail.activity.reputation"]
+        Reputation._suppression_filter_refresh(Reputation._suppression_filter())
+        self.recipient._email_bounced_unset()
+        self.assertFalse(self.recipient.email_bounced)
+        self.assertFalse(Reputation._suppressed_addresses([self.recipient.email]))
+        # The bounce is forgotten when rebuilding too
+        Reputation._rebuild([self.recipient.email])
+        self.assertFalse(Reputation._suppressed_addresses([self.recipient.email]))
+        with patch(mock_send_email) as mock_func:
+            mail, tracking = self.mail_send(self.recipient.email)
+            mock_func.assert_called_once()
+        self.assertNotEqual(tracking.state, "suppressed")
+        # New bounces suppress the address again
+        tracking.event_create("hard_bounce", {})
+        self.assertEqual(
+            Reputation._suppressed_addresses([self.recipient.email]),
+            {self.recipient.email},
+        )
+
     def test_bounce_new_partner(self):
         mail, tracking = self.mail_send(self.recipient.email)
         tracking.event_create("hard_bounce", {})
@@ -601,6 +980,102 @@ class TestMailTracking(TransactionCase):
         new_partner.email = self.recipient.email
         self.assertTrue(new_partner.email_bounced)
 
+    def test_bounce_new_partners_batch(self):
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("hard_bounce", {})
+        partners = self.env["res.partner"].create(
+            [
+                {"name": "Test bounced", "email": self.recipient.email.upper()},
+                {"name": "Test bounced too", "email": self.recipient.email},
+                {"name": "Test not bounced", "email": "other@example.com"},
+            ]
+        )
+        self.assertEqual(partners.mapped("email_bounced"), [True, True, False])
+
+    def test_reputation_counters(self):
+        Tracking = self.env["mail.activity.tracking"]
+        Reputation = self.env["mail.activity.reputation"]
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("open", {})
+        mail, last_tracking = self.mail_send(self.recipient.email)
+        last_tracking.event_create("hard_bounce", {})
+        reputation = Reputation._find(self.recipient.email)
+        self.assertEqual(reputation._state_counts(), {"opened": 1, "bounced": 1})
+        self.assertEqual(
+            Tracking._email_last_tracking_state(self.recipient.email),
+            [{"id": last_tracking.id, "state": "bounced"}],
+        )
+        self.assertTrue(Tracking.email_is_bounced(self.recipient.email))
+        self.assertEqual(
+            Tracking.email_score_from_email(self.recipient.email),
+            (tracking | last_tracking).email_score(),
+        )
+        last_tracking.unlink()
+        self.assertEqual(reputation._state_counts(), {"opened": 1})
+        self.assertEqual(reputation.last_tracking_id, tracking)
+        # The rebuild gives the same summary
+        Reputation._rebuild()
+        reputation = Reputation._find(self.recipient.email)
+        self.assertEqual(reputation._state_counts(), {"opened": 1})
+
+    def test_reputation_score_decay(self):
+        Tracking = self.env["mail.activity.tracking"]
+        Reputation = self.env["mail.activity.reputation"]
+        self.mail_send(self.recipient.email)[1].event_create("open", {})
+        self.assertEqual(Tracking.email_score_from_email(self.recipient.email), 55.0)
+        reputation = Reputation._find(self.recipient.email)
+        reputation.score_date -= timedelta(days=180)
+        self.assertAlmostEqual(
+            Tracking.email_score_from_email(self.recipient.email), 52.5
+        )
+        # The faded value is kept when new states are added
+        self.mail_send(self.recipient.email)[1].event_create("open", {})
+        self.assertAlmostEqual(reputation.score_value, 7.5)
+        self.env["ir.config_parameter"].set_param(
+            "mail_activity_tracking.score_weights", '{"opened": 1.0}'
+        )
+        self.env["ir.config_parameter"].set_param(
+            "mail_activity_tracking.score_half_life", "0"
+        )
+        Reputation._rebuild([self.recipient.email])
+        self.assertEqual(Tracking.email_score_from_email(self.recipient.email), 52.0)
+
+    def test_reputation_score_transition(self):
+        Reputation = self.env["mail.activity.reputation"]
+        mail, tracking = self.mail_send(self.recipient.email)
+        tracking.event_create("delivered", {})
+        # Delivered a while ago
+        self.env.cr.execute(
+            "UPDATE mail_activity_tracking SET state_date = %s WHERE id = %s",
+            (self.env.cr.now() - timedelta(days=90), tracking.id),
+        )
+        tracking.invalidate_recordset(["state_date"])
+        Reputation._rebuild([self.recipient.email])
+        reputation = Reputation._find(self.recipient.email)
+        # Other writes don't change when the state was set
+        tracking.error_type = "unrelated"
+        Reputation._rebuild([self.recipient.email])
+        self.assertAlmostEqual(reputation.score_value, 0.5**0.5)
+        tracking.event_create("open", {})
+        incremental = reputation.score_value
+        Reputation._rebuild([self.recipient.email])
+        self.assertAlmostEqual(reputation.score_value, incremental)
+        self.assertAlmostEqual(incremental, 5.0)
+
+    def test_partners_email_score_batch(self):
+        self.mail_send(self.recipient.email)[1].event_create("open", {})
+        self.mail_send(self.recipient.email)
+        self.mail_send(self.sender.email)[1].event_create("hard_bounce", {})
+        partners = self.sender | self.recipient
+        partners.invalidate_recordset(["email_score", "tracking_emails_count"])
+        self.assertEqual(partners.mapped("tracking_emails_count"), [1, 2])
+        scores = self.env["mail.activity.tracking"].email_score_from_emails(
+            [self.sender.email, self.recipient.email.upper(), False]
+        )
+        self.assertEqual(scores[self.sender.email], self.sender.email_score)
+        self.assertEqual(scores[self.recipient.email.upper()], self.recipient.email_score)
+        self.assertEqual(scores[False], 0.0)
+
     def test_recordset_email_score(self):
         """For backwords compatibility sake"""
         trackings = self.env["mail.activity.tracking"]
@@ -610,6 +1085,99 @@ class TestMailTracking(TransactionCase):
             trackings |= tracking
         self.assertEqual(100.0, trackings.email_score())
 
+    def test_search_acl_limit(self):
+        user = self.env["res.users"].create(
+            {
+                "name": "Tracking user",
+                "login": "tracking-user",
+                "groups_id": [Command.set(self.env.ref("base.group_user").ids)],
+            }
+        )
+        private_message = self.env["mail.message"].create(
+            {"body": "<p>Private</p>", "author_id": self.sender.id}
+        )
+        Tracking = self.env["mail.activity.tracking"]
+        hidden = Tracking.create(
+            [{"name": "Hidden", "mail_message_id": private_message.id}] * 3
+        )
+        visible = Tracking.create([{"name": "Visible"}] * 3)
+        domain = [("id", "in", (hidden | visible).ids)]
+        Tracking = Tracking.with_user(user)
+        self.assertEqual(Tracking.search(domain), visible)
+        # Pages aren't shortened by the filtered trackings
+        self.assertEqual(len(Tracking.search(domain, limit=2)), 2)
+        self.assertEqual(Tracking.search_count(domain), 3)
+        with self.assertRaises(AccessError):
+            hidden.with_user(user).read(["name"])
+
+    def test_search_acl_user_notification(self):
+        user = self.env["res.users"].create(
+            {
+                "name": "Tracking user",
+                "login": "tracking-user",
+                "groups_id": [Command.set(self.env.ref("base.group_user").ids)],
+            }
+        )
+        messages = self.env["mail.message"].create(
+            [
+                {
+                    "body": "<p>Document</p>",
+                    "author_id": self.sender.id,
+                    "model": "res.partner",
+                    "res_id": self.recipient.id,
+                    "message_type": message_type,
+                }
+                for message_type in ("comment", "user_notification")
+            ]
+        )
+        Tracking = self.env["mail.activity.tracking"]
+        visible, hidden = Tracking.create(
+            [
+                {"name": "Tracking", "mail_message_id": message.id}
+                for message in messages
+            ]
+        )
+        domain = [("id", "in", (visible | hidden).ids)]
+        # Readable documents don't expose the notifications of other users
+        self.assertEqual(Tracking.with_user(user).search(domain), visible)
+        # Unless they're sent to the user
+        messages[1].partner_ids = user.partner_id
+        self.assertEqual(Tracking.with_user(user).search(domain), visible | hidden)
+
+    def test_allowed_cache_invalidation(self):
+        user = self.env["res.users"].create(
+            {
+                "name": "Tracking user",
+                "login": "tracking-user",
+                "groups_id": [Command.set(self.env.ref("base.group_user").ids)],
+            }
+        )
+        message = self.env["mail.message"].create(
+            {"body": "<p>Private</p>", "author_id": self.sender.id}
+        )
+        tracking = self.env["mail.activity.tracking"].create(
+            {"name": "Cached", "mail_message_id": message.id}
+        )
+        self.assertFalse(tracking.with_user(user)._find_allowed_tracking_ids())
+        # Repeated checks are answered by the transaction cache
+        with self.assertQueryCount(0):
+            tracking.with_user(user)._find_allowed_tracking_ids()
+        message.author_id = user.partner_id
+        self.assertEqual(
+            tracking.with_user(user)._find_allowed_tracking_ids(), tracking.ids
+        )
+        # Notifications change what the users can read too
+        message.author_id = self.sender
+        self.assertFalse(tracking.with_user(user)._find_allowed_tracking_ids())
+        notification = self.env["mail.notification"].create(
+            {"mail_message_id": message.id, "res_partner_id": user.partner_id.id}
+        )
+        self.assertEqual(
+            tracking.with_user(user)._find_allowed_tracking_ids(), tracking.ids
+        )
+        notification.unlink()
+        self.assertFalse(tracking.with_user(user)._find_allowed_tracking_ids())
+
     def test_bounce_tracking_event_created(self):
         mail, tracking = self.mail_send(self.recipient.email)
         message = self.env.ref("mail.mail_message_channel_1_1")
@@ -641,6 +1209,61 @@ class TestMailTracking(TransactionCase):
             in message.mail_tracking_ids.tracking_event_ids.mapped("event_type")
         )
 
+    def test_prepare_outgoing_list_batch(self):
+        mail = self.env["mail.mail"].create(
+            {
+                "subject": "Test subject",
+                "email_from": "from@domain.com",
+                "recipient_ids": [Command.set((self.sender | self.recipient).ids)],
+                "body_html": "<p>This is a test message</p>",
+            }
+        )
+        emails = mail._prepare_outgoing_list()
+        trackings = self.env["mail.activity.tracking"].search(
+            [("mail_id", "=", mail.id)]
+        )
+        self.assertEqual(len(trackings), 2)
+        for email in emails:
+            tracking = trackings.filtered(
+                lambda t, email=email: t.partner_id == email["partner_id"]
+            )
+            self.assertIn(tracking._get_mail_tracking_img(), email["body"])
+            self.assertEqual(email["body"].count("data-odoo-tracking-email"), 1)
+
+    def test_document_mail_status(self):
+        lead = self.env["crm.lead"].create({"name": "Test lead"})
+        mail = self.env["mail.mail"].create(
+            {
+                "subject": "Test subject",
+                "email_from": "from@domain.com",
+                "email_to": self.recipient.email,
+                "body_html": "<p>This is a test message</p>",
+                "model": "crm.lead",
+                "res_id": lead.id,
+            }
+        )
+        mail.send()
+        tracking = mail.mail_message_id.mail_tracking_ids
+        self.assertEqual(lead.mail_status, "sent")
+        self.assertEqual(lead.mail_status_date, tracking.time)
+        tracking.event_create("open", {})
+        self.assertEqual(lead.mail_status, "opened")
+        self.assertEqual(
+            self.env["crm.lead"].search(
+                [("id", "=", lead.id), ("mail_status", "=", "opened")]
+            ),
+            lead,
+        )
+        # Moving the tracking to another document refreshes both of them
+        other_lead = self.env["crm.lead"].create({"name": "Other lead"})
+        other_message = other_lead.message_post(body="<p>Other</p>")
+        tracking.mail_message_id = other_message
+        self.assertFalse(lead.mail_status)
+        self.assertFalse(lead.mail_status_date)
+        self.assertEqual(other_lead.mail_status, "opened")
+        tracking.unlink()
+        self.assertFalse(other_lead.mail_status)
+
     def test_tracking_img_tag(self):
         # As the img tag is not in the body of the returned mail.mail record,
         # we have to intercept the IrMailServer.send_email method here to get
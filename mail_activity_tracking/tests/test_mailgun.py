@@ -1,5 +1,6 @@
 from contextlib import contextmanager, suppress
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qsl, urlsplit
 
 from freezegun import freeze_time
 from werkzeug.exceptions import NotAcceptable
@@ -20,6 +21,50 @@ except ImportError:
 _packagepath = "odoo.addons.mail_activity_tracking"
 
 
+class FakeMailgun:
+    """Local stand-in for Mailgun's suppressions API, with tiny pages"""
+
+    def __init__(self, lists, page_size=2):
+        self.lists = {name: list(addresses) for name, addresses in lists.items()}
+        self.page_size = page_size
+        self.calls = []
+
+    def _response(self, status_code, payload=None):
+        response = MagicMock(status_code=status_code)
+        response.json.return_value = payload or {}
+        return response
+
+    def _list_name(self, url):
+        return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+    def get(self, url, auth=None, params=None, timeout=None):
+        self.calls.append(("GET", url))
+        list_name, address = urlsplit(url).path.rsplit("/", 2)[-2:]
+        if "@" in address:
+            # Single address lookup
+            found = address in self.lists.get(list_name, ())
+            return self._response(200 if found else 404)
+        query = dict(parse_qsl(urlsplit(url).query), **(params or {}))
+        page = int(query.get("page", 0))
+        addresses = self.lists.get(self._list_name(url), [])
+        items = addresses[page * self.page_size : (page + 1) * self.page_size]
+        next_url = "{}?page={}".format(url.split("?")[0], page + 1)
+        return self._response(
+            200,
+            {
+                "items": [{"address": address} for address in items],
+                "paging": {"next": next_url},
+            },
+        )
+
+    def post(self, url, auth=None, json=None, timeout=None):
+        self.calls.append(("POST", url))
+        self.lists.setdefault(self._list_name(url), []).extend(
+            item["address"] for item in json
+        )
+        return self._response(200)
+
+
 @freeze_time("2016-08-12 17:00:00", tick=True)
 class TestMailgun(TransactionCase):
     def mail_send(self):
@@ -440,12 +485,99 @@ class TestMailgun(TransactionCase):
         self.partner.force_unset_bounced()
         self.assertFalse(self.partner.email_bounced)
 
+    def test_bounced_reconcile(self):
+        Partner = self.env["res.partner"]
+        bounced, complained, recovered, clean = Partner.create(
+            [
+                {"name": "Bounced", "email": "bounced@example.com"},
+                {"name": "Complained", "email": "Complained@example.com"},
+                {"name": "Recovered", "email": "recovered@example.com"},
+                {"name": "Clean", "email": "clean@example.com"},
+            ]
+        )
+        recovered.email_bounced = True
+        fake = FakeMailgun(
+            {
+                "bounces": ["bounced@example.com", "a@example.com", "b@example.com"],
+                "complaints": ["complained@example.com"],
+            }
+        )
+        with patch(f"{_packagepath}.models.res_partner.requests", fake):
+            (bounced | complained | recovered | clean)._mailgun_bounced_reconcile()
+            self.assertEqual(
+                (bounced | complained | recovered | clean).mapped("email_bounced"),
+                [True, True, False, False],
+            )
+            # The bounces list has 2 pages, plus the empty ones ending each list
+            self.assertEqual(len([c for c in fake.calls if c[0] == "GET"]), 6)
+            clean.force_set_bounced()
+            self.assertTrue(clean.email_bounced)
+            self.assertIn("clean@example.com", fake.lists["bounces"])
+            method, url = fake.calls[-1]
+            self.assertEqual(method, "POST")
+            self.assertTrue(url.endswith("/bounces"))
+
+    def test_bounced_check_limit(self):
+        Partner = self.env["res.partner"]
+        partners = Partner.create(
+            [
+                {"name": f"Partner {i}", "email": f"partner{i}@example.com"}
+                for i in range(101)
+            ]
+        )
+        partners[1].email_bounced = True
+        fake = FakeMailgun(
+            {
+                "bounces": ["partner0@example.com", "other@example.com"],
+                "complaints": ["partner2@example.com"],
+            }
+        )
+        expected = [True, False, False] + [False] * 98
+        with patch(f"{_packagepath}.models.res_partner.requests", fake):
+            # Above the limit, the bounces list is downloaded
+            partners.check_email_bounced()
+            self.assertEqual(partners.mapped("email_bounced"), expected)
+            self.assertFalse(
+                [url for __, url in fake.calls if url.endswith("@example.com")]
+            )
+            self.assertFalse([url for __, url in fake.calls if "/complaints" in url])
+            # Below it, each email is asked for, with the same results
+            partners[0].email_bounced = False
+            partners[1].email_bounced = True
+            fake.calls.clear()
+            partners[:100].check_email_bounced()
+            partners[100:].check_email_bounced()
+            self.assertEqual(partners.mapped("email_bounced"), expected)
+            self.assertEqual(len(fake.calls), 101)
+
+    def test_bounced_reconcile_local(self):
+        partner = self.env["res.partner"].create(
+            {"name": "Local", "email": self.recipient}
+        )
+        self.tracking_email.event_create("hard_bounce", {})
+        self.assertTrue(partner.email_bounced)
+        fake = FakeMailgun({})
+        with patch(f"{_packagepath}.models.res_partner.requests", fake):
+            # Bounces learned from the trackings aren't on Mailgun's lists
+            self.env["res.partner"]._mailgun_bounced_reconcile()
+            self.assertTrue(partner.email_bounced)
+            partner.check_email_bounced()
+            self.assertTrue(partner.email_bounced)
+            reputation = self.env["mail.activity.reputation"]._find(self.recipient)
+            self.assertEqual(reputation.last_state, "bounced")
+
     def test_email_bounced_set(self):
+        Bounce = self.env["mail.activity.bounce"]
         message_number = len(self.partner.message_ids) + 1
         self.partner._email_bounced_set("test_error", False)
+        self.partner._email_bounced_set("other_error", False)
+        Bounce._cron_post_digests()
+        # Both notifications come in a single digest
         self.assertEqual(len(self.partner.message_ids), message_number)
+        self.assertIn("other_error", self.partner.message_ids[0].body)
         self.partner.email = ""
         self.partner._email_bounced_set("test_error", False)
+        Bounce._cron_post_digests()
         self.assertEqual(len(self.partner.message_ids), message_number)
 
     @patch(f"{_packagepath}.models.mail_activity_tracking.requests")
@@ -61,6 +61,21 @@ class ResConfigSettings(models.TransientModel):
         help="Leave empty to use the base Odoo URL.",
     )
 
+    mail_tracking_event_store_limit = fields.Integer(
+        string="Stored engagement events",
+        config_parameter="mail_activity_tracking.event_store_limit",
+        default=50,
+        help="Max number of open and click events stored for each tracking email. "
+        "Further opens and clicks are only counted. Set 0 to store them all.",
+    )
+    mail_tracking_score_half_life = fields.Integer(
+        string="Email score half-life",
+        config_parameter="mail_activity_tracking.score_half_life",
+        default=180,
+        help="Days after which the weight of a tracking state in the email "
+        "scores is halved. Set 0 to keep the full weight forever.",
+    )
+
     def get_values(self):
         """Is Mailgun enabled?"""
         result = super().get_values()